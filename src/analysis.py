@@ -0,0 +1,596 @@
+# Solvers which find launch parameters using batches of projectiles
+# Created: 17/10/26
+# Projectiles are described by a dictionary of the arguments of ProjectileNoDrag or ProjectileDrag, as in sweep.
+# Each value is either a single number or an array with one value per problem being solved
+
+import numpy as np                  # Used for vector calculations
+import projectile                   # Used for simulating the projectiles
+from concurrent.futures import ProcessPoolExecutor  # Used for running Monte Carlo chunks on many cores
+from multiprocessing import shared_memory           # Used for sending statistics from other processes
+
+
+INVERSE_GOLDEN_RATIO = (5 ** 0.5 - 1) / 2
+
+
+def has_drag(config):
+    """
+    Checks if projectiles have drag
+    :param config: The arguments of each projectile
+    :type config: dict[str, float | np.ndarray]
+    :return: if the arguments of ProjectileDrag are given
+    :rtype: bool
+    """
+    return any(name in config for name in projectile.DRAG_ARGUMENTS)
+
+
+def simulate(config, dt=0.01, integrator="semi-implicit euler", ground=0):
+    """
+    Calculates the results of many projectiles at once, using ProjectileBatch for projectiles with drag
+    :param config: The arguments of each projectile
+    :type config: dict[str, float | np.ndarray]
+    :param dt: The interval between updating position for projectiles with drag
+    :type dt: float
+    :param integrator: The name of the fixed-step integrator used for drag
+    :type integrator: str
+    :param ground: The heights where projectiles with drag land
+    :type ground: float | np.ndarray
+    :return: arrays of the landing time, landing position, max height, time of max height, and final speed
+    :rtype: dict[str, np.ndarray]
+    """
+    if has_drag(config):
+        return projectile.ProjectileBatch(**config, integrator=integrator, ground=ground).fly(dt).results()
+    return projectile.no_drag_results(**config)
+
+
+def ranges(config, dt=0.01, integrator="semi-implicit euler", ground=0):
+    """
+    Calculates the horizontal distance from the launch point to the landing point of many projectiles at once. The
+    projectiles have drag if the arguments of ProjectileDrag are given
+    :param config: The arguments of each projectile
+    :type config: dict[str, float | np.ndarray]
+    :param dt: The interval between updating position for projectiles with drag
+    :type dt: float
+    :param integrator: The name of the fixed-step integrator used for drag
+    :type integrator: str
+    :param ground: The heights where projectiles with drag land
+    :type ground: float | np.ndarray
+    :return: the horizontal ranges, which are NaN for projectiles which never reach their ground
+    :rtype: np.ndarray
+    """
+    landing_pos = simulate(config, dt, integrator, ground)["landing_pos"]
+    return np.hypot(landing_pos[:, 0] - config["x"], landing_pos[:, 1] - config["y"])
+
+
+def golden_section(f, low, high, tol=1e-3):
+    """
+    Finds the maximum of many unimodal functions at once using golden-section search. Each iteration calls f once
+    with one new point per function
+    :param f: The functions, which take an array of points and return the value of each function at its point
+    :type f: Callable
+    :param low: The lower bounds of the intervals containing the maxima
+    :type low: float | np.ndarray
+    :param high: The upper bounds of the intervals containing the maxima
+    :type high: float | np.ndarray
+    :param tol: The width of the final intervals
+    :type tol: float
+    :return: the points of the maxima and the values at those points
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+    a, b = np.broadcast_arrays(np.asarray(low, dtype=float), np.asarray(high, dtype=float))
+    a, b = a.copy(), b.copy()
+    c = b - INVERSE_GOLDEN_RATIO * (b - a)
+    d = a + INVERSE_GOLDEN_RATIO * (b - a)
+    fc, fd = f(c), f(d)
+    # Each iteration shrinks every interval by the same ratio
+    iterations = int(np.ceil(np.log(tol / max(np.max(b - a), tol)) / np.log(INVERSE_GOLDEN_RATIO)))
+    for _ in range(iterations):
+        left = fc > fd  # Maximum is between a and d
+        b = np.where(left, d, b)
+        a = np.where(left, a, c)
+        c, d = (np.where(left, b - INVERSE_GOLDEN_RATIO * (b - a), d),
+                np.where(left, c, a + INVERSE_GOLDEN_RATIO * (b - a)))
+        new = f(np.where(left, c, d))
+        fc, fd = np.where(left, new, fd), np.where(left, fc, new)
+    best = fc > fd
+    return np.where(best, c, d), np.where(best, fc, fd)
+
+
+def optimal_elevation(config, dt=0.01, integrator="semi-implicit euler", low=0, high=90, tol=1e-3):
+    """
+    Finds the elevation angle which gives the maximum horizontal range of many projectiles at once. Without drag this
+    is 45 degrees from the ground, but drag makes it lower. Takes about 25 batches of flights
+    :param config: The arguments of each projectile, apart from ele_angle
+    :type config: dict[str, float | np.ndarray]
+    :param dt: The interval between updating position for projectiles with drag
+    :type dt: float
+    :param integrator: The name of the fixed-step integrator used for drag
+    :type integrator: str
+    :param low: The lowest elevation angle searched
+    :type low: float | np.ndarray
+    :param high: The highest elevation angle searched
+    :type high: float | np.ndarray
+    :param tol: The accuracy of the elevation angles in degrees
+    :type tol: float
+    :return: the best elevation angles and the ranges they give
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+    return golden_section(lambda ele_angle: ranges(config | {"ele_angle": ele_angle}, dt, integrator),
+                          low, high, tol)
+
+
+def illinois(f, low, high, f_low, f_high, tol=1e-3, max_iterations=50):
+    """
+    Finds a root of many functions at once using the Illinois method, a secant method which keeps the root between
+    two bounds. Each iteration calls f once with one new point per function
+    :param f: The functions, which take an array of points and return the value of each function at its point
+    :type f: Callable
+    :param low: The lower bounds of the intervals containing the roots
+    :type low: np.ndarray
+    :param high: The upper bounds of the intervals containing the roots
+    :type high: np.ndarray
+    :param f_low: The values of the functions at the lower bounds
+    :type f_low: np.ndarray
+    :param f_high: The values of the functions at the upper bounds
+    :type f_high: np.ndarray
+    :param tol: The largest absolute value of a function at its root
+    :type tol: float
+    :param max_iterations: The most times f is called
+    :type max_iterations: int
+    :return: the roots, which are NaN if the values at the bounds have the same sign or no root was found
+    :rtype: np.ndarray
+    """
+    low, high, f_low, f_high = (np.array(value, dtype=float) for value in np.broadcast_arrays(low, high, f_low, f_high))
+    # Bounds which are already roots are used as they are
+    converged = (np.abs(f_low) < tol) | (np.abs(f_high) < tol)
+    x = np.where(np.abs(f_high) < tol, high, low)
+    side = np.zeros_like(x)  # Which bound was replaced last, so the value at the other can be halved
+    done = converged | (f_low * f_high > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(max_iterations):
+            if done.all():
+                break
+            x = np.where(done, x, high - f_high * (high - low) / (f_high - f_low))
+            fx = f(x)
+            converged = converged | (~done & (np.abs(fx) < tol))
+            done = done | converged
+            replace_high = ~done & (fx * f_high > 0)
+            replace_low = ~done & ~replace_high
+            f_low = np.where(replace_high & (side == 1), f_low / 2, f_low)
+            f_high = np.where(replace_low & (side == -1), f_high / 2, f_high)
+            high, f_high = np.where(replace_high, x, high), np.where(replace_high, fx, f_high)
+            low, f_low = np.where(replace_low, x, low), np.where(replace_low, fx, f_low)
+            side = np.where(replace_high, 1, np.where(replace_low, -1, side))
+    return np.where(converged, x, np.nan)
+
+
+def expand(f, high, tries=30):
+    """
+    Doubles upper bounds until the functions are not negative there
+    :param f: The functions, which take an array of points and return the value of each function at its point
+    :type f: Callable
+    :param high: The first upper bounds, which are positive
+    :type high: np.ndarray
+    :param tries: The most times the bounds are doubled
+    :type tries: int
+    :return: the upper bounds and the values of the functions there, which are negative if no bound was found
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+    f_high = f(high)
+    for _ in range(tries):
+        short = f_high < 0
+        if not short.any():
+            break
+        high = np.where(short, 2 * high, high)
+        f_high = f(high)
+    return high, f_high
+
+
+def velocity_for_range(distance, config, dt=0.01, integrator="semi-implicit euler", tol=1e-3, max_iterations=50):
+    """
+    Finds the lowest launch speed which reaches a horizontal range, and the elevation angle it is launched at. The
+    speed is found using the Illinois method, where the maximum range at each speed is found with optimal_elevation
+    :param distance: The horizontal ranges to reach
+    :type distance: float | np.ndarray
+    :param config: The arguments of each projectile, apart from velocity and ele_angle
+    :type config: dict[str, float | np.ndarray]
+    :param dt: The interval between updating position for projectiles with drag
+    :type dt: float
+    :param integrator: The name of the fixed-step integrator used for drag
+    :type integrator: str
+    :param tol: The accuracy of the range in metres
+    :type tol: float
+    :param max_iterations: The most times the speed is updated
+    :type max_iterations: int
+    :return: the launch speeds and elevation angles, which are NaN if the range could not be reached
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+    distance, gravity = (np.atleast_1d(value).astype(float) for value in np.broadcast_arrays(distance,
+                                                                                             config["gravity"]))
+    best = {}  # Elevation angles of the last speeds tried
+
+    def error(velocity):
+        best["ele_angle"], max_range = optimal_elevation(config | {"velocity": velocity}, dt, integrator)
+        return max_range - distance
+
+    # A speed of 0 lands at the launch point, and the speed without drag on flat ground is a lower bound for the
+    # speed needed, so the upper bound is doubled from there until the range is reached
+    high, f_high = expand(error, np.sqrt(gravity * distance))
+    velocity = illinois(error, 0, high, -distance, f_high, tol, max_iterations)
+    return velocity, np.where(np.isnan(velocity), np.nan, best["ele_angle"])
+
+
+def _target_geometry(target, config):
+    """
+    Finds the direction and distance from the launch points to the targets
+    :param target: The coordinates of the targets, shape (3,) or (N, 3)
+    :type target: Iterable[float] | np.ndarray
+    :param config: The arguments of each projectile
+    :type config: dict[str, float | np.ndarray]
+    :return: the azimuth angles, horizontal distances, and heights of the targets above the launch points
+    :rtype: tuple[np.ndarray, np.ndarray, np.ndarray]
+    """
+    target = np.atleast_2d(np.asarray(target, dtype=float))
+    dx, dy, dz = (np.atleast_1d(value).astype(float) for value in np.broadcast_arrays(
+        target[:, 0] - np.asarray(config["x"]), target[:, 1] - np.asarray(config["y"]),
+        target[:, 2] - np.asarray(config["z"])))
+    return np.degrees(np.arctan2(dy, dx)), np.hypot(dx, dy), dz
+
+
+def target_elevation(target, config, dt=0.01, integrator="semi-implicit euler", tol=1e-3, max_iterations=50):
+    """
+    Finds the launch angles which hit targets, falling onto them. Arcs which only pass through a target while still
+    rising are not counted, with or without drag. The azimuth angle points at the target, and there are up to two
+    elevation angles: the low and high arcs. Without drag they are calculated exactly. With drag the maximum distance
+    is found with golden-section search, then the arc on each side of it with the Illinois method
+    :param target: The coordinates of the targets, shape (3,) or (N, 3)
+    :type target: Iterable[float] | np.ndarray
+    :param config: The arguments of each projectile, apart from ele_angle and azi_angle
+    :type config: dict[str, float | np.ndarray]
+    :param dt: The interval between updating position for projectiles with drag
+    :type dt: float
+    :param integrator: The name of the fixed-step integrator used for drag
+    :type integrator: str
+    :param tol: The distance in metres the projectiles can miss the targets by
+    :type tol: float
+    :param max_iterations: The most times each elevation angle is updated
+    :type max_iterations: int
+    :return: the azimuth angles, and the low and high elevation angles which are NaN if the target can't be hit
+    :rtype: tuple[np.ndarray, np.ndarray, np.ndarray]
+    """
+    azi_angle, distance, height = _target_geometry(target, config)
+    if not has_drag(config):
+        velocity, gravity = np.broadcast_arrays(np.asarray(config["velocity"], dtype=float),
+                                                np.asarray(config["gravity"], dtype=float))
+        # Solves the trajectory equation as a quadratic in tan(ele_angle)
+        discriminant = velocity ** 4 - gravity * (gravity * distance ** 2 + 2 * height * velocity ** 2)
+        root = np.sqrt(np.maximum(discriminant, 0))
+        low = np.arctan2(velocity ** 2 - root, gravity * distance)
+        high = np.arctan2(velocity ** 2 + root, gravity * distance)
+        hit = discriminant >= 0
+
+        def falling(ele_angle):  # Whether the apex is before the target, as with drag only falling hits are found
+            return distance >= velocity ** 2 * np.sin(ele_angle) * np.cos(ele_angle) / gravity
+
+        return (azi_angle, np.where(hit & falling(low), np.degrees(low), np.nan),
+                np.where(hit & falling(high), np.degrees(high), np.nan))
+
+    ground = np.asarray(config["z"]) + height  # Projectiles land at the height of their target
+
+    def error(ele_angle):
+        distances = ranges(config | {"ele_angle": ele_angle, "azi_angle": azi_angle}, dt, integrator, ground)
+        return np.nan_to_num(distances, nan=-1) - distance  # Projectiles which don't reach the target's height are short
+
+    # The distance increases up to the best elevation angle and then decreases
+    down, up = np.full_like(distance, -90), np.full_like(distance, 90)
+    best, furthest = golden_section(error, down, up)
+    low = illinois(error, down, best, error(down), furthest, tol, max_iterations)
+    high = illinois(error, best, up, furthest, error(up), tol, max_iterations)
+    return azi_angle, low, high
+
+
+def target_velocity(target, config, dt=0.01, integrator="semi-implicit euler", tol=1e-3, max_iterations=50):
+    """
+    Finds the launch speeds which hit targets, falling onto them, for a given elevation angle. Speeds which only pass
+    through a target while still rising are not counted, with or without drag. The azimuth angle points at the
+    target. Without drag the speed is calculated exactly, and with drag it is found with the Illinois method
+    :param target: The coordinates of the targets, shape (3,) or (N, 3)
+    :type target: Iterable[float] | np.ndarray
+    :param config: The arguments of each projectile, apart from velocity and azi_angle
+    :type config: dict[str, float | np.ndarray]
+    :param dt: The interval between updating position for projectiles with drag
+    :type dt: float
+    :param integrator: The name of the fixed-step integrator used for drag
+    :type integrator: str
+    :param tol: The distance in metres the projectiles can miss the targets by
+    :type tol: float
+    :param max_iterations: The most times each speed is updated
+    :type max_iterations: int
+    :return: the azimuth angles and launch speeds, which are NaN if the target can't be hit
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+    azi_angle, distance, height = _target_geometry(target, config)
+    ele_angle, gravity = np.broadcast_arrays(np.radians(np.asarray(config["ele_angle"], dtype=float)),
+                                             np.asarray(config["gravity"], dtype=float))
+    # Speed without drag, from the trajectory equation
+    rise = distance * np.tan(ele_angle) - height
+    with np.errstate(divide="ignore", invalid="ignore"):
+        velocity = np.where(rise > 0, distance / np.cos(ele_angle) * np.sqrt(gravity / (2 * rise)), np.nan)
+    if not has_drag(config):
+        # The apex is before the target when distance >= velocity^2 sin(ele_angle) cos(ele_angle) / gravity, which
+        # with the speed above is when the straight line along the launch angle is at least twice the target's height
+        return azi_angle, np.where(distance * np.tan(ele_angle) >= 2 * height, velocity, np.nan)
+
+    ground = np.asarray(config["z"]) + height
+
+    def error(speed):
+        distances = ranges(config | {"velocity": speed, "azi_angle": azi_angle}, dt, integrator, ground)
+        return np.nan_to_num(distances, nan=-1) - distance
+
+    # Drag only slows the projectile, so the speed without drag is a lower bound for the speed needed
+    hit = ~np.isnan(velocity)
+    high, f_high = expand(error, np.where(hit, velocity, 1))
+    speed = illinois(error, 0, high, error(np.zeros_like(high)), f_high, tol, max_iterations)
+    return azi_angle, np.where(hit, speed, np.nan)
+
+
+class StreamingStats:
+    def __init__(self, bins=64, extent=None):
+        """
+        Keeps statistics of landing points which are added in chunks, using the same memory however many are added.
+        The mean and covariance are combined with Chan's method and the points are counted in a 2D histogram
+        :param bins: The number of histogram bins along each axis
+        :type bins: int
+        :param extent: The histogram range as ((x_min, x_max), (y_min, y_max)), or None to fit the first chunk
+        :type extent: tuple[tuple[float, float], tuple[float, float]] | None
+        """
+        self.bins = bins
+        self.extent = extent
+        self.n = 0  # Number of points added
+        self.missed = 0  # Number of NaN points left out
+        self.mean = np.zeros(2)
+        self.m2 = np.zeros((2, 2))  # Sum of the outer products of the deviations from the mean
+        self.histogram = np.zeros((bins, bins), dtype=np.int64)
+        self.x_edges = self.y_edges = None
+
+    def fitEdges(self, points):
+        """
+        Sets the edges of the histogram bins from the extent, or to cover 5 standard deviations of the points if there
+        is no extent. The edges are not set if there is no extent and no valid points
+        :param points: The landing points, shape (n, 2)
+        :type points: np.ndarray
+        """
+        if self.extent is None:
+            points = points[~np.isnan(points).any(axis=1)]
+            if not len(points):
+                return
+            spread = 5 * np.maximum(points.std(axis=0), 1e-9)
+            self.extent = tuple(zip(points.mean(axis=0) - spread, points.mean(axis=0) + spread))
+        self.x_edges = np.linspace(*self.extent[0], self.bins + 1)
+        self.y_edges = np.linspace(*self.extent[1], self.bins + 1)
+
+    def update(self, points):
+        """
+        Adds a chunk of landing points
+        :param points: The landing points, shape (n, 2)
+        :type points: np.ndarray
+        """
+        if self.x_edges is None:
+            self.fitEdges(points)
+        if self.x_edges is None:  # Every point was NaN
+            self.missed += len(points)
+        else:
+            self.addSummary(summarise(points, self.x_edges, self.y_edges))
+
+    def addSummary(self, summary):
+        """
+        Adds the statistics of a chunk of landing points, combining the means and covariances with Chan's method
+        :param summary: The statistics from summarise, using the same histogram bins
+        :type summary: np.ndarray
+        """
+        n = int(summary[0])
+        self.missed += int(summary[1])
+        if not n:
+            return
+        delta = summary[2:4] - self.mean
+        total = self.n + n
+        self.m2 += summary[4:8].reshape(2, 2) + np.outer(delta, delta) * self.n * n / total
+        self.mean += delta * n / total
+        self.n = total
+        self.histogram += summary[8:].reshape(self.bins, self.bins).astype(np.int64)
+
+    @property
+    def covariance(self):
+        """
+        The sample covariance matrix of the points
+        :rtype: np.ndarray
+        """
+        return self.m2 / max(self.n - 1, 1)
+
+    def ellipse(self, probability=0.5):
+        """
+        Calculates the ellipse around the mean which contains a fraction of the points, assuming they are normally
+        distributed
+        :param probability: The fraction of points inside the ellipse
+        :type probability: float
+        :return: the semi-major and semi-minor axes, and the angle of the major axis from the x axis in degrees
+        :rtype: tuple[float, float, float]
+        """
+        eigenvalues, eigenvectors = np.linalg.eigh(self.covariance)
+        scale = (-2 * np.log(1 - probability)) ** 0.5
+        major, minor = scale * np.sqrt(np.maximum(eigenvalues[::-1], 0))
+        angle = np.degrees(np.arctan2(eigenvectors[1, 1], eigenvectors[0, 1])) % 180
+        return float(major), float(minor), float(angle)
+
+    def cep(self, centre=None):
+        """
+        Estimates the circular error probable, the radius of the circle containing half the points, from the
+        histogram. The accuracy is limited by the size of the bins, and points outside the histogram are counted as
+        further away than every bin
+        :param centre: The centre of the circle, or None for the mean
+        :type centre: Iterable[float] | None
+        :return: the radius, which is infinite if half the points are outside the histogram, or NaN if there are no
+            points
+        :rtype: float
+        """
+        if not self.n:
+            return float("nan")
+        centre = self.mean if centre is None else np.asarray(centre, dtype=float)
+        x = (self.x_edges[:-1] + self.x_edges[1:]) / 2
+        y = (self.y_edges[:-1] + self.y_edges[1:]) / 2
+        radius = np.hypot(x[:, None] - centre[0], y[None, :] - centre[1]).ravel()
+        order = np.argsort(radius)
+        counts = np.cumsum(self.histogram.ravel()[order])
+        i = np.searchsorted(counts, self.n / 2)
+        if i == len(radius):  # The bins don't contain half the points
+            return float("inf")
+        return float(radius[order][i])
+
+
+def summarise(points, x_edges, y_edges):
+    """
+    Calculates the statistics of one chunk of landing points, which can be added to StreamingStats
+    :param points: The landing points, shape (n, 2)
+    :type points: np.ndarray
+    :param x_edges: The edges of the histogram bins along the x axis
+    :type x_edges: np.ndarray
+    :param y_edges: The edges of the histogram bins along the y axis
+    :type y_edges: np.ndarray
+    :return: the number of points, the number of NaN points left out, the mean, the sum of the outer products of the
+        deviations from the mean, and the histogram, flattened into one array
+    :rtype: np.ndarray
+    """
+    valid = ~np.isnan(points).any(axis=1)
+    points = points[valid]
+    summary = np.zeros(8 + (len(x_edges) - 1) * (len(y_edges) - 1))
+    summary[0], summary[1] = len(points), np.count_nonzero(~valid)
+    if len(points):
+        mean = points.mean(axis=0)
+        deviation = points - mean
+        summary[2:4] = mean
+        summary[4:8] = (deviation.T @ deviation).ravel()
+        summary[8:] = np.histogram2d(points[:, 0], points[:, 1], (x_edges, y_edges))[0].ravel()
+    return summary
+
+
+def sample(rng, distribution, size):
+    """
+    Draws random values of a parameter
+    :param rng: The random number generator
+    :type rng: np.random.Generator
+    :param distribution: A function taking the generator and size, or the name of a np.random.Generator method and
+        its arguments, such as ("normal", 50, 0.5) or ("uniform", 0.4, 0.5)
+    :type distribution: Callable | tuple
+    :param size: The number of values
+    :type size: int
+    :return: the values
+    :rtype: np.ndarray
+    """
+    if callable(distribution):
+        return distribution(rng, size)
+    name, *arguments = distribution
+    return getattr(rng, name)(*arguments, size=size)
+
+
+def _monte_carlo_points(config, distributions, size, seed_sequence, dt, integrator):
+    """
+    Simulates one chunk of a Monte Carlo run
+    :param config: The arguments which are the same for every projectile
+    :type config: dict[str, float]
+    :param distributions: The distribution of each uncertain argument, as in sample
+    :type distributions: dict[str, Callable | tuple]
+    :param size: The number of projectiles
+    :type size: int
+    :param seed_sequence: The seed of the chunk's random number generator
+    :type seed_sequence: np.random.SeedSequence
+    :param dt: The interval between updating position for projectiles with drag
+    :type dt: float
+    :param integrator: The name of the fixed-step integrator used for drag
+    :type integrator: str
+    :return: the landing points, shape (size, 2)
+    :rtype: np.ndarray
+    """
+    rng = np.random.default_rng(seed_sequence)
+    values = {name: sample(rng, distribution, size) for name, distribution in distributions.items()}
+    return simulate(config | values, dt, integrator)["landing_pos"][:, :2]
+
+
+def _monte_carlo_worker(memory_name, shape, slot, x_edges, y_edges, *chunk):
+    """
+    Simulates one chunk of a Monte Carlo run in a worker process, writing its summary into shared memory
+    :param memory_name: The name of the shared memory block holding one summary per chunk
+    :type memory_name: str
+    :param shape: The shape of the summaries
+    :type shape: tuple[int, int]
+    :param slot: The row the summary is written to
+    :type slot: int
+    :param x_edges: The edges of the histogram bins along the x axis
+    :type x_edges: np.ndarray
+    :param y_edges: The edges of the histogram bins along the y axis
+    :type y_edges: np.ndarray
+    :param chunk: The arguments of _monte_carlo_points
+    """
+    memory = shared_memory.SharedMemory(name=memory_name)
+    summaries = np.ndarray(shape, buffer=memory.buf)
+    summaries[slot] = summarise(_monte_carlo_points(*chunk), x_edges, y_edges)
+    del summaries  # The memory can't be closed while an array uses it
+    memory.close()
+
+
+def monte_carlo(config, distributions, n_samples, seed=0, chunk_size=100000, dt=0.01, integrator="semi-implicit euler",
+                bins=64, extent=None, workers=1):
+    """
+    Finds the dispersion of the landing points of projectiles with uncertain arguments. The samples are simulated in
+    chunks which each have their own random number generator spawned from the seed, so the results can be repeated
+    with any number of workers. With more than one worker, the chunks after the one which sets the histogram bins are
+    shared between processes, which write their statistics straight into shared memory
+    :param config: The arguments which are the same for every projectile
+    :type config: dict[str, float]
+    :param distributions: The distribution of each uncertain argument, as in sample. They must be picklable to use
+        more than one worker
+    :type distributions: dict[str, Callable | tuple]
+    :param n_samples: The number of projectiles
+    :type n_samples: int
+    :param seed: The seed of the random number generators
+    :type seed: int
+    :param chunk_size: The number of projectiles simulated at once
+    :type chunk_size: int
+    :param dt: The interval between updating position for projectiles with drag
+    :type dt: float
+    :param integrator: The name of the fixed-step integrator used for drag
+    :type integrator: str
+    :param bins: The number of histogram bins along each axis
+    :type bins: int
+    :param extent: The histogram range as ((x_min, x_max), (y_min, y_max)), or None to fit the first chunk
+    :type extent: tuple[tuple[float, float], tuple[float, float]] | None
+    :param workers: The number of processes used
+    :type workers: int
+    :return: the statistics of the landing points
+    :rtype: StreamingStats
+    """
+    stats = StreamingStats(bins, extent)
+    sizes = [min(chunk_size, n_samples - start) for start in range(0, n_samples, chunk_size)]
+    chunks = [(config, distributions, size, seed_sequence, dt, integrator)
+              for size, seed_sequence in zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes)))]
+
+    # Every chunk must use the same histogram bins, so chunks are run here until they are set
+    while chunks and (stats.x_edges is None or workers <= 1):
+        stats.update(_monte_carlo_points(*chunks.pop(0)))
+    if not chunks:
+        return stats
+
+    shape = (len(chunks), 8 + bins * bins)
+    memory = shared_memory.SharedMemory(create=True, size=8 * shape[0] * shape[1])
+    try:
+        summaries = np.ndarray(shape, buffer=memory.buf)
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(_monte_carlo_worker, memory.name, shape, slot, stats.x_edges, stats.y_edges,
+                                       *chunk) for slot, chunk in enumerate(chunks)]
+            for future in futures:
+                future.result()
+        for summary in summaries:  # Added in order so the results don't depend on the number of workers
+            stats.addSummary(summary)
+        del summaries
+    finally:
+        memory.close()
+        memory.unlink()
+    return stats
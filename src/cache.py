@@ -0,0 +1,210 @@
+# Cache of simulation results so the same projectile is not simulated twice
+# Created: 17/10/26
+# Results are found by a hash of every input which changes them, and are kept in memory up to a size limit, with the
+# least recently used removed first. They can also be kept in an SQLite file so they last between sessions
+
+import numpy as np                  # Used for storing the results
+import hashlib                      # Used for hashing the inputs
+import io                           # Used for converting the results to bytes
+import json                         # Used for writing the inputs in one order
+import sqlite3                      # Used for the disk cache
+import threading                    # Used for sharing the cache between threads
+from collections import OrderedDict  # Used for finding the least recently used results
+from projectile import ENGINE_VERSION  # Changes when the results change, so old results are not used
+from projectile import recorder     # Used for writing recording policies in one form
+
+
+def cache_key(projectile_class, values, dt, options=None):
+    """
+    Hashes every input of a simulation. The inputs are written as JSON with sorted keys first, so the same inputs
+    always give the same key. A recording policy in the options is written as its name and value, whether it was given
+    as a Recorder or a tuple
+    :param projectile_class: The class of the projectile
+    :type projectile_class: type
+    :param values: The arguments of the projectile
+    :type values: dict[str, float]
+    :param dt: The interval between updating position
+    :type dt: float
+    :param options: The integrator options, such as the integrator, tolerances and recording policy
+    :type options: dict[str, Any] | None
+    :return: the key
+    :rtype: str
+    """
+    options = options or {}
+    if options.get("recording") is not None:
+        policy = recorder(options["recording"]).policy()
+        if policy is None:
+            raise ValueError("Only recording policies in RECORDERS can be cached")
+        options = options | {"recording": policy}
+    inputs = {
+        "class": projectile_class.__name__,
+        "values": {name: float(value) for name, value in values.items()},
+        "dt": float(dt),
+        "options": options,
+        "version": ENGINE_VERSION
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def pack(state):
+    """
+    Converts the state of a projectile to bytes
+    :param state: The state from Projectile.getState
+    :type state: dict[str, np.ndarray | float]
+    :return: the bytes
+    :rtype: bytes
+    """
+    buffer = io.BytesIO()
+    np.savez(buffer, **state)
+    return buffer.getvalue()
+
+
+def unpack(data):
+    """
+    Converts bytes from pack back to the state of a projectile
+    :param data: The bytes
+    :type data: bytes
+    :return: the state
+    :rtype: dict[str, np.ndarray | float]
+    """
+    with np.load(io.BytesIO(data)) as arrays:
+        return {name: arrays[name] if arrays[name].ndim else arrays[name].item() for name in arrays.files}
+
+
+class SimulationCache:
+    def __init__(self, max_bytes=64 * 2 ** 20, path=None):
+        """
+        Creates a cache of simulation results
+        :param max_bytes: The most memory used by the results kept in memory
+        :type max_bytes: int
+        :param path: The path of the SQLite file used to keep results between sessions, or None to only use memory
+        :type path: str | None
+        """
+        self.max_bytes = max_bytes
+        self.size = 0  # Bytes used by the results in memory
+        self.memory = OrderedDict()  # Results from least to most recently used
+        self.counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self.lock = threading.Lock()
+
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("""CREATE TABLE IF NOT EXISTS Results
+                (key                TEXT        PRIMARY KEY,
+                state               BLOB        NOT NULL)""")
+            self.db.commit()
+
+    def __len__(self):
+        return len(self.memory)
+
+    def get(self, key):
+        """
+        Finds the results of a simulation, checking memory first and then the disk
+        :param key: The key from cache_key
+        :type key: str
+        :return: the state of the projectile, or None if it is not cached
+        :rtype: dict[str, np.ndarray | float] | None
+        """
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.counters["hits"] += 1
+                return self.memory[key]
+            row = None
+            if self.db is not None:
+                row = self.db.execute("SELECT state FROM Results WHERE key=?", [key]).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["disk_hits"] += 1
+            state = unpack(row[0])
+            self._remember(key, state)
+            return state
+
+    def put(self, key, state):
+        """
+        Stores the results of a simulation in memory and on the disk
+        :param key: The key from cache_key
+        :type key: str
+        :param state: The state from Projectile.getState
+        :type state: dict[str, np.ndarray | float]
+        """
+        with self.lock:
+            self._remember(key, state)
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO Results (key, state) VALUES (?, ?)", [key, pack(state)])
+                self.db.commit()
+
+    def _remember(self, key, state):
+        """
+        Keeps results in memory, removing the least recently used results until they fit
+        :param key: The key from cache_key
+        :type key: str
+        :param state: The state from Projectile.getState
+        :type state: dict[str, np.ndarray | float]
+        """
+        if key in self.memory:
+            self.size -= self._sizeOf(self.memory.pop(key))
+        self.memory[key] = state
+        self.size += self._sizeOf(state)
+        while self.size > self.max_bytes and len(self.memory) > 1:
+            self.size -= self._sizeOf(self.memory.popitem(last=False)[1])
+            self.counters["evictions"] += 1
+
+    @staticmethod
+    def _sizeOf(state):
+        """
+        Calculates the memory used by the arrays of a state
+        :param state: The state from Projectile.getState
+        :type state: dict[str, np.ndarray | float]
+        :return: the number of bytes
+        :rtype: int
+        """
+        return sum(value.nbytes if isinstance(value, np.ndarray) else 8 for value in state.values())
+
+    def fly(self, projectile_class, values, dt, options=None, progress=None, **kwargs):
+        """
+        Creates a projectile and flies it, or restores its results if the same inputs were simulated before
+        :param projectile_class: The class of the projectile
+        :type projectile_class: type
+        :param values: The arguments of the projectile
+        :type values: dict[str, float]
+        :param dt: The interval between updating position
+        :type dt: float
+        :param options: The integrator options, such as the integrator, tolerances and recording policy
+        :type options: dict[str, Any] | None
+        :param progress: Function given each chunk of the path from Projectile.stream as it is calculated, which can
+            raise an exception to stop the flight, or None to fly without streaming
+        :type progress: Callable[[np.ndarray], None] | None
+        :param kwargs: Appearance options for the scatter graph, which don't change the results. A recording policy
+            given as recording is moved to the options, as it changes the stored path
+        :return: the projectile after landing
+        :rtype: projectile.Projectile
+        """
+        options = options or {}
+        if "recording" in kwargs:
+            options = options | {"recording": kwargs.pop("recording")}
+        proj = projectile_class(**values, **options, **kwargs)
+        key = cache_key(projectile_class, values, dt, options)
+        state = self.get(key)
+        if state is None:
+            if progress is None:
+                proj.fly(dt)
+            else:
+                for chunk in proj.stream(dt):
+                    progress(chunk)
+            self.put(key, proj.getState())
+        else:
+            proj.setState(state)
+        return proj
+
+    def clear(self):
+        """
+        Removes every result from memory and the disk
+        """
+        with self.lock:
+            self.memory.clear()
+            self.size = 0
+            if self.db is not None:
+                self.db.execute("DELETE FROM Results")
+                self.db.commit()
@@ -1,5 +1,48 @@
 import sqlite3
 from os import PathLike
+import struct
+import zlib
+import numpy as np
+
+
+# Fields of the Results table which presets can be filtered and sorted by
+INDEXED_RESULTS = ("distance", "landing_x", "landing_y", "landing_time", "max_h", "final_speed")
+PATH_FORMAT = "<4sIId"  # Header of an encoded path: tag, version, number of rows, resolution
+PATH_TAG = b"PATH"
+
+
+def encode_path(path, resolution=1e-4):
+    """
+    Compresses a flight path to store as a BLOB. The values are rounded to multiples of the resolution, and the
+    differences of the differences between rows are stored, which are small for smooth paths. The bytes of these
+    integers are grouped by significance before compressing with zlib
+    :param path: The rows of (time, x, y, z)
+    :type path: np.ndarray
+    :param resolution: The largest rounding error of each value, in seconds or metres
+    :type resolution: float
+    :return: the compressed path
+    :rtype: bytes
+    """
+    values = np.round(np.asarray(path, dtype=float) / resolution).astype(np.int64)
+    differences = np.diff(values, n=2, axis=0, prepend=np.zeros((2, values.shape[1]), dtype=np.int64))
+    shuffled = np.ascontiguousarray(differences).view(np.uint8).reshape(-1, 8).T.tobytes()
+    return struct.pack(PATH_FORMAT, PATH_TAG, 1, len(values), resolution) + zlib.compress(shuffled, 9)
+
+
+def decode_path(blob):
+    """
+    Decompresses a flight path from encode_path
+    :param blob: The compressed path
+    :type blob: bytes
+    :return: the rows of (time, x, y, z)
+    :rtype: np.ndarray
+    """
+    tag, version, rows, resolution = struct.unpack_from(PATH_FORMAT, blob)
+    if tag != PATH_TAG or version != 1:
+        raise ValueError("Unknown path format")
+    shuffled = np.frombuffer(zlib.decompress(blob[struct.calcsize(PATH_FORMAT):]), dtype=np.uint8)
+    differences = shuffled.reshape(8, -1).T.copy().view(np.int64).reshape(rows, 4)
+    return np.cumsum(np.cumsum(differences, axis=0), axis=0) * resolution
 
 
 class Database:
@@ -41,6 +84,36 @@ class Database:
             FOREIGN KEY (EID) REFERENCES Environments (EID),
             FOREIGN KEY (PID) REFERENCES Projectiles (PID),
             FOREIGN KEY (MID) REFERENCES Motion (MID))""")
+
+        # Computed paths of presets, so they can be shown without simulating. Compared presets have two paths
+        self.c.execute("""CREATE TABLE IF NOT EXISTS Trajectories
+            (name               TEXT        NOT NULL,
+            drag                TEXT        NOT NULL,
+            path                BLOB        NOT NULL,
+            PRIMARY KEY (name, drag),
+            FOREIGN KEY (name) REFERENCES Presets (name) ON DELETE CASCADE)""")
+
+        # Computed results of presets, indexed so presets can be filtered and sorted by them
+        self.c.execute("""CREATE TABLE IF NOT EXISTS Results
+            (name               TEXT        NOT NULL,
+            drag                TEXT        NOT NULL,
+            landing_x           REAL        NOT NULL,
+            landing_y           REAL        NOT NULL,
+            landing_z           REAL        NOT NULL,
+            final_vx            REAL        NOT NULL,
+            final_vy            REAL        NOT NULL,
+            final_vz            REAL        NOT NULL,
+            final_speed         REAL        NOT NULL,
+            distance            REAL        NOT NULL,
+            landing_time        REAL        NOT NULL,
+            max_h               REAL        NOT NULL,
+            max_t               REAL        NOT NULL,
+            engine_version      INTEGER     NOT NULL,
+            PRIMARY KEY (name, drag),
+            FOREIGN KEY (name) REFERENCES Presets (name) ON DELETE CASCADE)""")
+        for field in INDEXED_RESULTS:
+            self.c.execute(f"CREATE INDEX IF NOT EXISTS Results_{field} ON Results ({field})")
+        self.c.execute("CREATE INDEX IF NOT EXISTS Results_engine_version ON Results (engine_version)")
         self.db.commit()  # Saves any changes
 
     def insertRecord(self, table, data):
@@ -125,6 +198,113 @@ class Database:
         self.c.execute(f"DELETE FROM {table} WHERE ({field}) IS ({primary_key})")
         self.db.commit()
 
+    def insertTrajectory(self, preset_name, drag, state, engine_version):
+        """
+        Stores the computed path and results of a preset
+        :param preset_name: The name of the preset
+        :type preset_name: str
+        :param drag: "drag" or "no_drag"
+        :type drag: str
+        :param state: The state from Projectile.getState
+        :type state: dict[str, Any]
+        :param engine_version: The version of the simulation which computed the path
+        :type engine_version: int
+        """
+        self.c.execute("INSERT OR REPLACE INTO Trajectories (name, drag, path) VALUES (?, ?, ?)",
+                       [preset_name, drag, encode_path(state["path"])])
+        self.insertResults(preset_name, drag, state, engine_version)
+
+    def insertResults(self, preset_name, drag, state, engine_version):
+        """
+        Stores the computed results of a preset
+        :param preset_name: The name of the preset
+        :type preset_name: str
+        :param drag: "drag" or "no_drag"
+        :type drag: str
+        :param state: The state from Projectile.getState
+        :type state: dict[str, Any]
+        :param engine_version: The version of the simulation which computed the results
+        :type engine_version: int
+        """
+        pos, v, start = (np.asarray(value, dtype=float) for value in (state["pos"], state["v"], state["path"][0, 1:]))
+        self.c.execute("""INSERT OR REPLACE INTO Results 
+        (name, drag, landing_x, landing_y, landing_z, final_vx, final_vy, final_vz, final_speed, distance, 
+        landing_time, max_h, max_t, engine_version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                       [preset_name, drag, *map(float, pos), *map(float, v), float(np.linalg.norm(v)),
+                        float(np.hypot(*(pos[:2] - start[:2]))), state["time"], state["max_h"], state["max_t"],
+                        engine_version])
+        self.db.commit()
+
+    def queryResults(self, field="distance", low=None, high=None, descending=False, limit=None):
+        """
+        Finds the results of presets with a field in a range, sorted by that field, using the field's index
+        :param field: The field in INDEXED_RESULTS which is filtered and sorted by
+        :type field: str
+        :param low: The lowest value of the field, or None for no lower limit
+        :type low: float | None
+        :param high: The highest value of the field, or None for no upper limit
+        :type high: float | None
+        :param descending: If the results are sorted from highest to lowest
+        :type descending: bool
+        :param limit: The most results returned, or None for all of them
+        :type limit: int | None
+        :return: The name, drag mode, and value of the field of each result
+        :rtype: list[tuple[str, str, float]]
+        """
+        if field not in INDEXED_RESULTS:  # Field names can't be parameters, so only known fields are allowed
+            raise ValueError(f"Unknown field '{field}'")
+        conditions, values = [], []
+        if low is not None:
+            conditions.append(f"{field} >= ?")
+            values.append(low)
+        if high is not None:
+            conditions.append(f"{field} <= ?")
+            values.append(high)
+        where = f"WHERE {" AND ".join(conditions)}" if conditions else ""
+        order = "DESC" if descending else "ASC"
+        self.c.execute(f"SELECT name, drag, {field} FROM Results {where} ORDER BY {field} {order}"
+                       + (" LIMIT ?" if limit is not None else ""), values + ([limit] if limit is not None else []))
+        return self.c.fetchall()
+
+    def missingResults(self, engine_version):
+        """
+        Finds the presets without results from the current version of the simulation
+        :param engine_version: The current version of the simulation
+        :type engine_version: int
+        :return: The names of the presets
+        :rtype: list[str]
+        """
+        self.c.execute("""SELECT name FROM Presets WHERE NOT EXISTS 
+        (SELECT 1 FROM Results WHERE Results.name=Presets.name AND Results.engine_version=?)""", [engine_version])
+        return [name for name, in self.c.fetchall()]
+
+    def selectTrajectories(self, preset_name, engine_version):
+        """
+        Fetches the stored paths and results of a preset from the current version of the simulation. Paths from
+        older versions are left out, as if they were missing
+        :param preset_name: The name of the preset
+        :type preset_name: str
+        :param engine_version: The current version of the simulation
+        :type engine_version: int
+        :return: The drag mode and state of each path, in the form of Projectile.getState
+        :rtype: dict[str, dict[str, Any]]
+        """
+        self.c.execute("""SELECT Trajectories.drag, path, landing_x, landing_y, landing_z, final_vx, final_vy, 
+        final_vz, landing_time, max_h, max_t FROM Trajectories, Results 
+        WHERE Trajectories.name=Results.name AND Trajectories.drag=Results.drag AND Trajectories.name=? 
+        AND Results.engine_version=?""", [preset_name, engine_version])
+        return {
+            drag: {
+                "path": decode_path(path),
+                "pos": np.array(results[:3]),
+                "v": np.array(results[3:6]),
+                "time": results[6],
+                "max_h": results[7],
+                "max_t": results[8]
+            }
+            for drag, path, *results in self.c.fetchall()
+        }
+
     def getPresets(self):
         """
         Selects all the preset names
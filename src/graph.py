@@ -0,0 +1,193 @@
+# Graph of flight paths which is kept between runs
+# Created: 17/10/26
+# Shows the paths of each run on one figure, and draws paths while they are calculated
+
+import numpy as np                  # Used for joining the parts of live paths
+from tkinter import TOP, BOTH       # Packing the canvas
+from matplotlib.figure import Figure  # Graph, without pyplot keeping every figure open
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # Drawing the graph off screen
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg  # Embedding the graph
+from mpl_toolkits.mplot3d.art3d import Line3DCollection  # Drawing many paths at once
+from matplotlib.colors import to_rgba_array  # Colouring each marker
+import projectile                   # Finding the limits of the paths
+
+
+def decimate(n, points):
+    """
+    Chooses evenly spaced indices of samples, including the first and last
+    :param n: The number of samples
+    :type n: int
+    :param points: The most indices chosen
+    :type points: int
+    :return: the indices
+    :rtype: np.ndarray
+    """
+    if n <= points:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, points).astype(int))
+
+
+class GraphDisplay:
+    def __init__(self, master=None, preview_points=200):
+        """
+        Creates the figure, axes and canvas of the graph of flight paths
+        :param master: The tkinter widget the graph is shown in, or None to draw it off screen
+        :type master: tkinter.Widget | None
+        :param preview_points: The most points of each path drawn while the graph is being moved
+        :type preview_points: int
+        """
+        self.figure = Figure()
+        if master is None:
+            self.canvas = FigureCanvasAgg(self.figure)
+        else:
+            self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+            self.canvas.get_tk_widget().pack(side=TOP, fill=BOTH, expand=1)
+
+        self.ax = self.figure.add_subplot(111, projection="3d")
+        self.ax.set_xlabel('X Axis / m')
+        self.ax.set_ylabel('Y Axis / m')
+        self.ax.set_zlabel('Z Axis / m')
+        self.preview_points = preview_points
+        # Artists of the paths, which are reused by later runs. Artists which aren't shown are given no points instead
+        # of being hidden, as 3D artists are still projected when hidden
+        # Lines through every point of each path, or through preview_points points while the graph is being moved
+        self.paths = Line3DCollection([])
+        self.ax.add_collection3d(self.paths, autolim=False)
+        self.markers = {}  # Scatter of the markers at about 20 points of each path, for each marker style
+        self.data = []  # Every point, the points with markers, the preview points, colour and marker of each path
+        self.moving = False  # Whether a mouse button is held down on the graph
+        self.live_lines = []  # Lines of the paths drawn while they are calculated, which are only drawn by drawLive
+        self.live_paths = None  # Parts of each live path so far, or None if paths aren't being drawn live
+        self.canvas.mpl_connect("draw_event", self._redrawLive)
+        self.canvas.mpl_connect("button_press_event", self._press)
+        self.canvas.mpl_connect("button_release_event", self._release)
+
+    def show(self, projectiles):
+        """
+        Shows the flight paths of projectiles, replacing the paths shown before. The artists already on the axes are
+        given the new data and the canvas is redrawn when it is next idle, so many runs don't use more memory or take
+        longer to show. Every path is drawn by one collection of lines, and the markers by one scatter for each marker
+        style, so showing 100 paths doesn't need 200 artists
+        :param projectiles: The projectiles which have landed
+        :type projectiles: list[projectile.Projectile]
+        """
+        self.live_paths = None
+        self.data = []
+        for proj in projectiles:
+            coords = proj.coords
+            n = (len(coords) // 20) + 1
+            self.data.append((coords, coords[::n], coords[decimate(len(coords), self.preview_points)], proj.colour,
+                              proj.marker))
+            if proj.marker not in self.markers:
+                self.markers[proj.marker] = self.ax.scatter([], [], [], marker=proj.marker, depthshade=False)
+        self.paths.set_color([colour for *points, colour, marker in self.data])
+        self._setDetail(not self.moving)
+
+        max_coords = projectile.path_bounds(projectiles)[1].max()  # Finds the max coordinate
+
+        # Keeps the same scale with axes
+        self.ax.set_xlim3d(0, max_coords)
+        self.ax.set_ylim3d(0, max_coords)
+        self.ax.set_zlim3d(0, max_coords)
+
+        self.canvas.draw_idle()
+
+    def startLive(self, colours, limit):
+        """
+        Clears the graph so paths can be drawn while they are calculated
+        :param colours: The colour of each path
+        :type colours: list[str]
+        :param limit: The largest coordinate the paths can reach, used as the limit of every axis
+        :type limit: float
+        """
+        self.data = []
+        self._setDetail(True)
+        for i, colour in enumerate(colours):
+            if i == len(self.live_lines):
+                # Animated lines are left out when the whole graph is drawn
+                self.live_lines.append(self.ax.plot([], [], [], animated=True)[0])
+            self.live_lines[i].set_color(colour)
+        self.live_paths = [[] for _ in colours]
+
+        self.ax.set_xlim3d(0, limit)
+        self.ax.set_ylim3d(0, limit)
+        self.ax.set_zlim3d(0, limit)
+        self.canvas.draw()
+
+    def drawLive(self, parts):
+        """
+        Adds the parts of paths calculated since the last frame to the graph. The limits are fixed by startLive, so only
+        the new parts are drawn on top of the last frame and copied to the screen, and frames don't get slower as the
+        paths get longer
+        :param parts: The index of the path and its new positions, shape (n, 3)
+        :type parts: Iterable[tuple[int, np.ndarray]]
+        """
+        if self.live_paths is None:
+            return
+        new = {}
+        for i, positions in parts:
+            if i not in new:  # Starts at the end of the last part so the line is joined
+                new[i] = [part[-1:] for part in self.live_paths[i][-1:]]
+            new[i].append(positions)
+            self.live_paths[i].append(positions)
+        for i, positions in new.items():
+            line = self.live_lines[i]
+            line.set_data_3d(*np.concatenate(positions).T)
+            self.ax.draw_artist(line)
+        if new:
+            self.canvas.blit(self.ax.bbox)
+
+    def _redrawLive(self, event):
+        """
+        Draws the whole of each live path again when the graph is redrawn, such as when it is rotated
+        :param event: The draw event
+        :type event: matplotlib.backend_bases.DrawEvent
+        """
+        if self.live_paths is None:
+            return
+        for line, parts in zip(self.live_lines, self.live_paths):
+            if parts:
+                positions = np.concatenate(parts)
+                if self.moving:
+                    positions = positions[decimate(len(positions), self.preview_points)]
+                line.set_data_3d(*positions.T)
+                self.ax.draw_artist(line)
+
+    def _setDetail(self, full):
+        """
+        Shows either the whole paths with their markers or the preview lines. While the graph is rotated or zoomed each
+        path is drawn through at most preview_points points, so rotating stays smooth however many points are shown
+        :param full: Whether the whole paths are shown
+        :type full: bool
+        """
+        self.paths.set_segments([coords if full else preview for coords, points, preview, colour, marker in self.data])
+        for style, scatter in self.markers.items():
+            groups = [(points, colour) for coords, points, preview, colour, marker in self.data
+                      if full and marker == style]
+            points = np.concatenate([points for points, colour in groups] or [np.empty((0, 3))])
+            scatter.set_offsets(points[:, :2])
+            scatter.set_3d_properties(points[:, 2], "z")
+            if groups:
+                scatter.set_color(np.repeat(to_rgba_array([colour for points, colour in groups]),
+                                            [len(points) for points, colour in groups], axis=0))
+
+    def _press(self, event):
+        """
+        Shows the preview lines when a mouse button is pressed on the graph, before it is rotated or zoomed
+        :param event: The mouse event
+        :type event: matplotlib.backend_bases.MouseEvent
+        """
+        if event.inaxes is self.ax:
+            self.moving = True
+            self._setDetail(False)
+
+    def _release(self, event):
+        """
+        Shows the whole paths again when the mouse button is released
+        :param event: The mouse event
+        :type event: matplotlib.backend_bases.MouseEvent
+        """
+        if self.moving:
+            self.moving = False
+            self._setDetail(True)
+            self.canvas.draw_idle()
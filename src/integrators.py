@@ -0,0 +1,542 @@
+# Numerical integrators for the equations of motion
+# Created: 17/10/26
+# The state of a projectile is stored as one array: [x, y, z, vx, vy, vz]
+
+import numpy as np                  # Used for vector calculations
+import time                         # Used for timing the integrators
+
+
+# Butcher tableau for the Dormand-Prince 5(4) method
+DP_C = np.array([0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1])
+DP_A = [np.array([]),
+        np.array([1 / 5]),
+        np.array([3 / 40, 9 / 40]),
+        np.array([44 / 45, -56 / 15, 32 / 9]),
+        np.array([19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729]),
+        np.array([9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656])]
+DP_B = np.array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84])
+# Difference between the 5th and 4th order solutions, used to estimate the error of a step
+DP_E = np.array([-71 / 57600, 0, 71 / 16695, -71 / 1920, 17253 / 339200, -22 / 525, 1 / 40])
+# Coefficients of the 4th order polynomial used for dense output
+DP_P = np.array([
+    [1, -8048581381 / 2820520608, 8663915743 / 2820520608, -12715105075 / 11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200 / 32700410799, -68118460800 / 10900136933, 87487479700 / 32700410799],
+    [0, -1754552775 / 470086768, 14199869525 / 1410260304, -10690763975 / 1880347072],
+    [0, 127303824393 / 49829197408, -318862633887 / 49829197408, 701980252875 / 199316789632],
+    [0, -282668133 / 205662961, 2019193451 / 616988883, -1453857185 / 822651844],
+    [0, 40617522 / 29380423, -110615467 / 29380423, 69997945 / 29380423]])
+
+
+class DenseSolution:
+    def __init__(self, t0, y0):
+        """
+        Stores the accepted steps of an adaptive integration so the state can be found at any time
+        :param t0: The initial time
+        :type t0: float
+        :param y0: The initial state
+        :type y0: np.ndarray
+        """
+        self.t = [t0]  # Times at the end of each step
+        self.y = [np.array(y0, dtype=float)]  # States at the end of each step
+        self._h = []  # Size of each step
+        self._q = []  # Dense output coefficients of each step
+
+    def __len__(self):
+        return len(self.t)
+
+    def addStep(self, t, y, h, q):
+        """
+        Adds an accepted step
+        :param t: The time at the end of the step
+        :type t: float
+        :param y: The state at the end of the step
+        :type y: np.ndarray
+        :param h: The size of the step
+        :type h: float
+        :param q: The dense output coefficients, shape (n, 4)
+        :type q: np.ndarray
+        """
+        self.t.append(t)
+        self.y.append(y)
+        self._h.append(h)
+        self._q.append(q)
+
+    def __call__(self, t):
+        """
+        Calculates the state at the given times using the dense output of the step containing each time
+        :param t: The times, between the first and last step
+        :type t: float | np.ndarray
+        :return: the states, shape (n,) for one time or (len(t), n) for an array of times
+        :rtype: np.ndarray
+        """
+        t = np.asarray(t, dtype=float)
+        times = np.asarray(self.t)
+        i = np.clip(np.searchsorted(times, t, side="right") - 1, 0, len(self._h) - 1)
+        h = np.asarray(self._h)[i]
+        theta = (t - times[i]) / h
+        powers = np.stack([theta, theta ** 2, theta ** 3, theta ** 4], axis=-1)
+        y0 = np.asarray(self.y)[i]
+        q = np.asarray(self._q)[i]
+        return y0 + h[..., None] * np.einsum("...ij,...j->...i", q, powers)
+
+
+class Event:
+    def __init__(self, name, function, direction=0, terminal=False):
+        """
+        Something which happens when a function of the state crosses zero, such as the projectile hitting the ground
+        :param name: The name of the event
+        :type name: str
+        :param function: Function g(t, y) which is zero when the event happens
+        :type function: Callable
+        :param direction: -1 to only detect g going from positive to negative, 1 for negative to positive, 0 for both
+        :type direction: int
+        :param terminal: If the integration ends when the event happens
+        :type terminal: bool
+        """
+        self.name = name
+        self.function = function
+        self.direction = direction
+        self.terminal = terminal
+
+    def __call__(self, t, y):
+        return self.function(t, y)
+
+    def crossed(self, g0, g1):
+        """
+        Checks if the event happened between two values of its function
+        :param g0: The value at the start of the step
+        :type g0: float | np.ndarray
+        :param g1: The value at the end of the step
+        :type g1: float | np.ndarray
+        :return: True if the event happened during the step
+        :rtype: bool | np.ndarray
+        """
+        falling = (g0 >= 0) & (g1 < 0)
+        rising = (g0 <= 0) & (g1 > 0)
+        if self.direction < 0:
+            return falling
+        if self.direction > 0:
+            return rising
+        return falling | rising
+
+
+def ground_event(level=0.0):
+    """
+    Creates the event for the projectile landing, which ends the integration
+    :param level: The height of the ground
+    :type level: float
+    :return: the event
+    :rtype: Event
+    """
+    return Event("ground", lambda t, y: y[..., 2] - level, direction=-1, terminal=True)
+
+
+def apex_event():
+    """
+    Creates the event for the projectile reaching its maximum height
+    :return: the event
+    :rtype: Event
+    """
+    return Event("apex", lambda t, y: y[..., 5], direction=-1)
+
+
+def altitude_event(height, direction=0):
+    """
+    Creates the event for the projectile crossing a given height
+    :param height: The height
+    :type height: float
+    :param direction: -1 for crossing while falling, 1 while rising, 0 for both
+    :type direction: int
+    :return: the event
+    :rtype: Event
+    """
+    return Event(f"altitude {height}", lambda t, y: y[..., 2] - height, direction)
+
+
+def range_event(distance, x=0.0, y=0.0):
+    """
+    Creates the event for the projectile reaching a given horizontal distance from a point
+    :param distance: The horizontal distance
+    :type distance: float
+    :param x: The x coordinate of the point
+    :type x: float
+    :param y: The y coordinate of the point
+    :type y: float
+    :return: the event
+    :rtype: Event
+    """
+    return Event(f"range {distance}", lambda t, s: np.hypot(s[..., 0] - x, s[..., 1] - y) - distance, direction=1)
+
+
+def hermite(t0, y0, f0, t1, y1, f1):
+    """
+    Creates the cubic Hermite interpolant of a step from the states and derivatives at both ends
+    :param t0: The time at the start of the step
+    :type t0: float | np.ndarray
+    :param y0: The state at the start of the step
+    :type y0: np.ndarray
+    :param f0: The derivative at the start of the step
+    :type f0: np.ndarray
+    :param t1: The time at the end of the step
+    :type t1: float | np.ndarray
+    :param y1: The state at the end of the step
+    :type y1: np.ndarray
+    :param f1: The derivative at the end of the step
+    :type f1: np.ndarray
+    :return: function which gives the state at times within the step
+    :rtype: Callable
+    """
+    h = np.asarray(t1 - t0, dtype=float)[..., None]
+
+    def interpolant(t):
+        s = np.asarray(t - t0, dtype=float)[..., None] / h
+        return ((1 + 2 * s) * (1 - s) ** 2 * y0 + s * (1 - s) ** 2 * h * f0
+                + s ** 2 * (3 - 2 * s) * y1 - s ** 2 * (1 - s) * h * f1)
+    return interpolant
+
+
+def bisect(g, t0, t1, iterations=60):
+    """
+    Finds the time where a function changes sign by halving the interval containing it
+    :param g: The function, which can be evaluated for an array of times
+    :type g: Callable
+    :param t0: The start of the interval
+    :type t0: float | np.ndarray
+    :param t1: The end of the interval, where g has a different sign to t0 or t0 is zero
+    :type t1: float | np.ndarray
+    :param iterations: The number of times the interval is halved
+    :type iterations: int
+    :return: the time where g changes sign
+    :rtype: float | np.ndarray
+    """
+    t0 = np.asarray(t0, dtype=float)
+    t1 = np.asarray(t1, dtype=float)
+    # If g starts at zero, the crossing being looked for is the one after it leaves zero
+    sign0 = np.sign(g(t0))
+    sign0 = np.where(sign0 == 0, -np.sign(g(t1)), sign0)
+    for _ in range(iterations):
+        mid = 0.5 * (t0 + t1)
+        same = np.sign(g(mid)) == sign0
+        t0 = np.where(same, mid, t0)
+        t1 = np.where(same, t1, mid)
+    return t1[()]
+
+
+def locate_events(events, values, t0, t1, y1, interpolant):
+    """
+    Finds the events which happened during a step
+    :param events: The events being detected
+    :type events: list[Event]
+    :param values: The values of each event function at the start of the step
+    :type values: list[float]
+    :param t0: The time at the start of the step
+    :type t0: float
+    :param t1: The time at the end of the step
+    :type t1: float
+    :param y1: The state at the end of the step
+    :type y1: np.ndarray
+    :param interpolant: Function which gives the state at any time within the step
+    :type interpolant: Callable
+    :return: the events which happened as (event, time, state) in time order, and the values at the end of the step
+    :rtype: tuple[list[tuple[Event, float, np.ndarray]], list[float]]
+    """
+    hits = []
+    new_values = [event(t1, y1) for event in events]
+    for event, g0, g1 in zip(events, values, new_values):
+        if event.crossed(g0, g1):
+            time = float(bisect(lambda t: event(t, interpolant(t)), t0, t1))
+            hits.append((event, time, interpolant(time)))
+    hits.sort(key=lambda hit: hit[1])
+    return hits, new_values
+
+
+def integrate(f, step, t0, y0, dt, events, max_steps=10 ** 7):
+    """
+    Moves the state with a fixed-step integrator until a terminal event happens. Events are located within each step
+    using the Hermite interpolant, and their states are included in the results in time order
+    :param f: The derivative of the state, f(t, y)
+    :type f: Callable
+    :param step: The fixed-step integrator, from INTEGRATORS
+    :type step: Callable
+    :param t0: The initial time
+    :type t0: float
+    :param y0: The initial state
+    :type y0: np.ndarray
+    :param dt: The size of each step
+    :type dt: float
+    :param events: The events to be detected
+    :type events: list[Event]
+    :param max_steps: The maximum number of steps
+    :type max_steps: int
+    :return: the times, the states, and the events which happened as (name, time, state)
+    :rtype: tuple[np.ndarray, np.ndarray, list[tuple[str, float, np.ndarray]]]
+    """
+    t = t0
+    y = np.array(y0, dtype=float)
+    fy = f(t, y)
+    values = [event(t, y) for event in events]
+    times, states, hits = [t], [y], []
+    for _ in range(max_steps):
+        y1 = step(f, t, y, dt)
+        t1 = t + dt
+        f1 = f(t1, y1)
+        step_hits, values = locate_events(events, values, t, t1, y1, hermite(t, y, fy, t1, y1, f1))
+        for event, time, state in step_hits:
+            times.append(time)
+            states.append(state)
+            hits.append((event.name, time, state))
+            if event.terminal:
+                return np.array(times), np.array(states), hits
+        times.append(t1)
+        states.append(y1)
+        t, y, fy = t1, y1, f1
+    return np.array(times), np.array(states), hits
+
+
+def initial_step(f, t0, y0, f0, rtol, atol):
+    """
+    Estimates a suitable size for the first step from the size of the state and its derivatives
+    :param f: The derivative of the state, f(t, y)
+    :type f: Callable
+    :param t0: The initial time
+    :type t0: float
+    :param y0: The initial state
+    :type y0: np.ndarray
+    :param f0: The derivative at the initial state
+    :type f0: np.ndarray
+    :param rtol: The relative tolerance
+    :type rtol: float
+    :param atol: The absolute tolerance
+    :type atol: float
+    :return: the size of the first step
+    :rtype: float
+    """
+    scale = atol + np.abs(y0) * rtol
+    d0 = np.sqrt(np.mean((y0 / scale) ** 2))
+    d1 = np.sqrt(np.mean((f0 / scale) ** 2))
+    h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01 * d0 / d1
+
+    f1 = f(t0 + h0, y0 + h0 * f0)
+    d2 = np.sqrt(np.mean(((f1 - f0) / scale) ** 2)) / h0
+    if d1 <= 1e-15 and d2 <= 1e-15:
+        h1 = max(1e-6, h0 * 1e-3)
+    else:
+        h1 = (0.01 / max(d1, d2)) ** (1 / 5)
+    return min(100 * h0, h1)
+
+
+def dormand_prince(f, t0, y0, events, rtol=1e-6, atol=1e-6, max_steps=100000):
+    """
+    Integrates the state with the adaptive Dormand-Prince 5(4) method. The size of each step is chosen so the
+    estimated error stays within the tolerances, and the integration ends when a terminal event happens. Events are
+    located within each step using the dense output
+    :param f: The derivative of the state, f(t, y)
+    :type f: Callable
+    :param t0: The initial time
+    :type t0: float
+    :param y0: The initial state
+    :type y0: np.ndarray
+    :param events: The events to be detected
+    :type events: list[Event]
+    :param rtol: The relative tolerance
+    :type rtol: float
+    :param atol: The absolute tolerance
+    :type atol: float
+    :param max_steps: The maximum number of accepted steps
+    :type max_steps: int
+    :return: the accepted steps with dense output, and the events which happened as (name, time, state)
+    :rtype: tuple[DenseSolution, list[tuple[str, float, np.ndarray]]]
+    """
+    t = t0
+    y = np.array(y0, dtype=float)
+    solution = DenseSolution(t, y)
+    values = [event(t, y) for event in events]
+    hits = []
+    k = np.empty((7, y.size))  # Stages of the current step
+    k[0] = f(t, y)
+    h = initial_step(f, t, y, k[0], rtol, atol)
+
+    while len(solution) <= max_steps:
+        for i in range(1, 6):
+            k[i] = f(t + DP_C[i] * h, y + h * (DP_A[i] @ k[:i]))
+        y_new = y + h * (DP_B @ k[:6])
+        k[6] = f(t + h, y_new)
+
+        # Estimates the error of the step relative to the tolerances
+        scale = atol + np.maximum(np.abs(y), np.abs(y_new)) * rtol
+        error = np.sqrt(np.mean((h * (DP_E @ k) / scale) ** 2))
+        if error > 1:  # Rejects the step and tries again with a smaller step
+            h *= max(0.2, 0.9 * error ** -0.2)
+            continue
+
+        solution.addStep(t + h, y_new, h, k.T @ DP_P)
+        step_hits, values = locate_events(events, values, t, t + h, y_new, solution)
+        for event, time, state in step_hits:
+            hits.append((event.name, time, state))
+            if event.terminal:
+                return solution, hits
+        t += h
+        y = y_new
+        k[0] = k[6]  # The last stage is the first stage of the next step
+        h *= 10 if error == 0 else min(10, 0.9 * error ** -0.2)
+    return solution, hits
+
+
+def euler(f, t, y, dt):
+    """
+    Explicit Euler step, first order
+    :param f: The derivative of the state, f(t, y)
+    :type f: Callable
+    :param t: The current time
+    :type t: float
+    :param y: The current state, shape (..., 6)
+    :type y: np.ndarray
+    :param dt: The size of the step
+    :type dt: float
+    :return: the state after the step
+    :rtype: np.ndarray
+    """
+    return y + dt * f(t, y)
+
+
+def semi_implicit_euler(f, t, y, dt):
+    """
+    Semi-implicit Euler step, first order. The velocity is updated first and the position is moved with the new
+    velocity, matching the original ProjectileDrag.move
+    :param f: The derivative of the state, f(t, y)
+    :type f: Callable
+    :param t: The current time
+    :type t: float
+    :param y: The current state, shape (..., 6)
+    :type y: np.ndarray
+    :param dt: The size of the step
+    :type dt: float
+    :return: the state after the step
+    :rtype: np.ndarray
+    """
+    v = y[..., 3:] + f(t, y)[..., 3:] * dt
+    return np.concatenate((y[..., :3] + v * dt, v), axis=-1)
+
+
+def verlet(f, t, y, dt):
+    """
+    Velocity Verlet step, second order. As the drag depends on the velocity, the acceleration at the end of the step
+    uses the velocity predicted by an Euler step
+    :param f: The derivative of the state, f(t, y)
+    :type f: Callable
+    :param t: The current time
+    :type t: float
+    :param y: The current state, shape (..., 6)
+    :type y: np.ndarray
+    :param dt: The size of the step
+    :type dt: float
+    :return: the state after the step
+    :rtype: np.ndarray
+    """
+    v = y[..., 3:]
+    a0 = f(t, y)[..., 3:]
+    pos = y[..., :3] + v * dt + 0.5 * a0 * dt ** 2
+    a1 = f(t + dt, np.concatenate((pos, v + a0 * dt), axis=-1))[..., 3:]
+    return np.concatenate((pos, v + 0.5 * (a0 + a1) * dt), axis=-1)
+
+
+def rk4(f, t, y, dt):
+    """
+    Classic Runge-Kutta step, fourth order
+    :param f: The derivative of the state, f(t, y)
+    :type f: Callable
+    :param t: The current time
+    :type t: float
+    :param y: The current state, shape (..., 6)
+    :type y: np.ndarray
+    :param dt: The size of the step
+    :type dt: float
+    :return: the state after the step
+    :rtype: np.ndarray
+    """
+    k1 = f(t, y)
+    k2 = f(t + 0.5 * dt, y + 0.5 * dt * k1)
+    k3 = f(t + 0.5 * dt, y + 0.5 * dt * k2)
+    k4 = f(t + dt, y + dt * k3)
+    return y + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+
+def dormand_prince_step(f, t, y, dt):
+    """
+    Dormand-Prince step of a fixed size without error control, fifth order. Used by the adaptive method when it is
+    moved one step at a time
+    :param f: The derivative of the state, f(t, y)
+    :type f: Callable
+    :param t: The current time
+    :type t: float
+    :param y: The current state, shape (..., 6)
+    :type y: np.ndarray
+    :param dt: The size of the step
+    :type dt: float
+    :return: the state after the step
+    :rtype: np.ndarray
+    """
+    k = [f(t, y)]
+    for i in range(1, 6):
+        k.append(f(t + DP_C[i] * dt, y + dt * sum(a * ki for a, ki in zip(DP_A[i], k))))
+    return y + dt * sum(b * ki for b, ki in zip(DP_B, k))
+
+
+# Integrators which can be chosen for a projectile. Each takes (f, t, y, dt) and returns the state after one step
+INTEGRATORS = {
+    "euler": euler,
+    "semi-implicit euler": semi_implicit_euler,
+    "verlet": verlet,
+    "rk4": rk4,
+    "rk45": dormand_prince_step
+}
+ADAPTIVE = ("rk45",)  # Integrators which choose their own step size when flying
+
+
+def benchmark(f, y0, t_end, reference, dts=(0.1, 0.01, 0.001), repeats=3):
+    """
+    Measures the error and CPU time of each fixed-step integrator
+    :param f: The derivative of the state, f(t, y)
+    :type f: Callable
+    :param y0: The initial state
+    :type y0: np.ndarray
+    :param t_end: The time the state is integrated to
+    :type t_end: float
+    :param reference: The exact state at t_end
+    :type reference: np.ndarray
+    :param dts: The step sizes to test
+    :type dts: Iterable[float]
+    :param repeats: The number of times each integration is timed
+    :type repeats: int
+    :return: rows of (name, dt, position error, CPU seconds)
+    :rtype: list[tuple[str, float, float, float]]
+    """
+    results = []
+    for name, step in INTEGRATORS.items():
+        for dt in dts:
+            n = round(t_end / dt)
+            start = time.process_time()
+            for _ in range(repeats):
+                t, y = 0, y0
+                for _ in range(n):
+                    y = step(f, t, y, dt)
+                    t += dt
+            cpu = (time.process_time() - start) / repeats
+            results.append((name, dt, float(np.linalg.norm(y[:3] - reference[:3])), cpu))
+    return results
+
+
+if __name__ == "__main__":
+    import projectile
+
+    proj = projectile.ProjectileDrag(velocity=50, ele_angle=40, azi_angle=30, x=0, y=0, z=2, gravity=9.81, mass=1,
+                                     air_density=1.225, drag_coefficient=0.47, area=0.05)
+    state0 = np.concatenate((proj.pos, proj.v)).astype(float)
+    end = 4.0
+    exact = dormand_prince(proj.derivative, 0, state0, [Event("end", lambda t, y: t - end, terminal=True)],
+                           rtol=1e-12, atol=1e-12)[0](end)
+
+    print(f"{'Integrator':<22}{'dt [s]':>8}{'Error [m]':>12}{'CPU [s]':>11}{'Error x CPU':>14}")
+    for row in benchmark(proj.derivative, state0, end, exact):
+        print(f"{row[0]:<22}{row[1]:>8}{row[2]:>12.3e}{row[3]:>11.4f}{row[2] * row[3]:>14.3e}")
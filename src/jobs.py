@@ -0,0 +1,151 @@
+# Runs simulations in a background thread so the window stays responsive
+# Created: 17/10/26
+# Only one job runs at a time. Submitting a job while another is running cancels it, and only the latest job submitted
+# while waiting is run, so pressing Run many times only simulates the last inputs. Jobs report their progress and find
+# out they were cancelled through Job.update, and the window polls them with root.after as tkinter can only be used
+# from the thread which created it
+
+import threading                    # Used for running jobs in the background
+import queue                        # Used for sending results to the window while the job runs
+
+
+# Raised by Job.update to stop a job which was cancelled
+class Cancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, function, args):
+        """
+        Creates a job which runs a function in the background
+        :param function: The function, which is given the job followed by the arguments, so it can call update
+        :type function: Callable
+        :param args: The arguments of the function
+        :type args: tuple
+        """
+        self.function = function
+        self.args = args
+        self.progress = 0.0  # Fraction of the job done
+        self.result = None
+        self.error = None  # Exception raised by the function
+        self.done = False  # Whether the job has finished, failed or been cancelled
+        self.cancelled = threading.Event()
+        self.output = queue.SimpleQueue()  # Values sent by the job while it runs, such as parts of a path
+
+    def update(self, progress):
+        """
+        Stores the progress of the job, stopping it if it was cancelled
+        :param progress: The fraction of the job done
+        :type progress: float
+        """
+        if self.cancelled.is_set():
+            raise Cancelled
+        self.progress = progress
+
+    def send(self, *values):
+        """
+        Sends values to the window while the job runs, which are read with receive
+        :param values: The values
+        """
+        self.output.put(values)
+
+    def receive(self):
+        """
+        Reads every value sent by the job so far
+        :return: the values sent by each call to send
+        :rtype: list[tuple]
+        """
+        values = []
+        while not self.output.empty():
+            values.append(self.output.get())
+        return values
+
+    def cancel(self):
+        """
+        Stops the job the next time it calls update
+        """
+        self.cancelled.set()
+
+    def run(self):
+        """
+        Runs the function and stores its result or the exception it raised
+        """
+        try:
+            if not self.cancelled.is_set():
+                self.result = self.function(self, *self.args)
+        except Cancelled:
+            pass
+        except Exception as error:
+            self.error = error
+        self.done = True
+
+
+class JobRunner:
+    def __init__(self):
+        """
+        Runs jobs in a background thread one at a time
+        """
+        self.lock = threading.Lock()
+        self.running = None  # Job being run
+        self.waiting = None  # Latest job submitted while another was running
+        self.latest = None  # Latest job submitted
+
+    def submit(self, function, *args):
+        """
+        Runs a function in the background, cancelling the job being run and any job waiting to run
+        :param function: The function, which is given the job followed by the arguments
+        :type function: Callable
+        :param args: The arguments of the function
+        :return: the job
+        :rtype: Job
+        """
+        job = Job(function, args)
+        with self.lock:
+            self.latest = job
+            if self.running is None:
+                self._start(job)
+            else:
+                self.running.cancel()
+                self._drop()
+                self.waiting = job
+        return job
+
+    def cancel(self):
+        """
+        Cancels the job being run and any job waiting to run
+        """
+        with self.lock:
+            if self.running is not None:
+                self.running.cancel()
+            self._drop()
+
+    def _drop(self):
+        """
+        Cancels the job waiting to run, which is never started
+        """
+        if self.waiting is not None:
+            self.waiting.cancel()
+            self.waiting.done = True
+            self.waiting = None
+
+    def _start(self, job):
+        """
+        Runs a job in a new thread
+        :param job: The job
+        :type job: Job
+        """
+        self.running = job
+        threading.Thread(target=self._work, args=(job,), daemon=True).start()
+
+    def _work(self, job):
+        """
+        Runs a job and then the job which was waiting, if there is one
+        :param job: The job
+        :type job: Job
+        """
+        job.run()
+        with self.lock:
+            self.running = None
+            if self.waiting is not None:
+                job, self.waiting = self.waiting, None
+                self._start(job)
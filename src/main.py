@@ -1,15 +1,18 @@
 # The main body of code
 # Created: 04/10/23
-# Last edited: 21/02/24
+# Last edited: 17/10/26 - paths of presets from older versions
 from tkinter import *  # GUI
 from tkinter import messagebox  # Error messages
 import ctypes
 import json  # Themes
 import sys
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg  # Embedding the graph
-import matplotlib.pyplot as plt  # Graph
+from threading import Thread  # Background jobs
 import projectile  # Projectile calculations
+import graph  # Graph of the flight paths
+import integrators  # Integrators for drag calculations
 import database
+import cache  # Reusing results of runs with the same inputs
+import jobs  # Running simulations in the background
 
 
 class HintLabel(Label):
@@ -247,6 +250,8 @@ def setupInterface(window):
             entry.config(state="disabled")
 
     CustomButton(input_frame, **style["button"], text="Run", width=10, command=run).place(x=380, y=480)
+    CustomButton(input_frame, **style["button"], text="Cancel", width=10, command=cancelRun).place(x=520, y=480)
+    Label(input_frame, **style["label"], textvariable=run_status).place(x=660, y=482)
 
     with open("definitions.txt", "r", encoding="UTF-8") as definition_file:  # Opens the file definitions.txt
         for x, line in enumerate(definition_file):  # Iterates over each line in the file
@@ -281,6 +286,7 @@ def setupInterface(window):
     # Graph
     graph_frame.config(bg=colours["bg"]),
     graph_frame.place(x=900, y=41, width=1020, height=1039)
+    display_frame.config(bg=colours["but_bg"])
 
 
 def openSettingsWindow():
@@ -315,21 +321,30 @@ def loadSettingsFrame(win):
     Checkbutton(settings_frame, **style["checkbutton"], text="Colourblind Mode",
                 variable=colourblind_mode).place(x=50, y=120)
 
+    Label(settings_frame, **style["label"], text="Integrator:").place(x=50, y=170)
+
+    integrator_menu = OptionMenu(settings_frame, current_integrator, *integrators.INTEGRATORS)
+    integrator_menu.config(**style["menu"], width=16)
+    integrator_menu.place(x=150, y=170)
+
     Button(settings_frame, bg=colours["but_bg"], fg=colours["text"], text="Confirm", command=updateScheme,
            borderwidth=0).pack(anchor="s", side=RIGHT)
 
 
-def updateSettings(theme, colourblind):
+def updateSettings(theme, colourblind, integrator):
     """
     Updates the file `config.json` with the new settings
     :param theme: The current theme
     :type theme: str
     :param colourblind: If colourblind mode is active
     :type colourblind: bool
+    :param integrator: The integrator used for drag calculations
+    :type integrator: str
     """
     with open("config.json", "r") as file:
         data = json.load(file)
-    data |= {"theme": theme, "colourblind": colourblind}
+    data |= {"theme": theme, "colourblind": colourblind, "integrator": integrator}
+    settings.update(data)
     new_data = json.dumps(data, indent=2)
     with open("config.json", "w") as file:
         file.write(new_data)
@@ -349,7 +364,7 @@ def updateScheme():
 
     style = loadTheme()  # Reloads the styles with the new theme
     loadFrames()  # Reloads the frames with the new theme
-    updateSettings(current_theme.get(), colourblind_mode.get())
+    updateSettings(current_theme.get(), colourblind_mode.get(), current_integrator.get())
 
 
 def loadFrames():
@@ -444,6 +459,19 @@ def loadTheme():
     return widget_style
 
 
+def integratorOptions():
+    """
+    Fetches the integrator settings used for projectiles with drag
+    :return: the keyword arguments for ProjectileDrag
+    :rtype: dict[str, str | float]
+    """
+    return {
+        "integrator": current_integrator.get(),
+        "rtol": settings.get("rtol", 1e-6),
+        "atol": settings.get("atol", 1e-6)
+    }
+
+
 def run():
     """
     Runs the simulation using the provided inputs
@@ -470,56 +498,182 @@ def run():
     if not valid:
         return
 
-    dt = 0.01
-    fig = plt.figure()
-    if drag.get() != "compare":
-        # Creates the objects using the values
-        if drag.get() == "drag":
-            proj = projectile.ProjectileDrag(**values, colour=colours["pos"])
-        else:
-            proj = projectile.ProjectileNoDrag(**values, colour=colours["neg"])
-        # Updates the position until it is on the ground
-        while proj.pos[2] >= 0:
-            proj.move(dt)
-
-        if drag.get() == "drag":
-            position.set(", ".join(str(round(x, 5)) for x in proj.pos))
-            landing_time.set(str(round(proj.time, 5)))
-        else:
-            position.set(", ".join(str(round(x, 5)) for x in proj.landing_pos))
-            landing_time.set(str(round(proj.landing_time, 5)))
-        velocity.set(str(round(projectile.mag(proj.v), 5)))
-        displacement.set(str(round(proj.calcDisplacement(), 5)))
-        max_height.set(str(round(proj.max_h, 5)))
-        time.set(str(round(proj.max_t, 5)))
-        # loadOutputFrame()
+    if settings.get("live_graph", True):  # Draws the paths while they are calculated
+        # The path without drag is the largest the paths can be, so the limits don't change during the run
+        no_drag_values = {key: values[key] for key in projectile.NO_DRAG_ARGUMENTS}
+        limit = projectile.ProjectileNoDrag(**no_drag_values).trajectory(n_samples=100).max()
+        path_colours = [colours["pos"]] * (drag.get() != "no_drag") + [colours["neg"]] * (drag.get() != "drag")
+        graph_display.startLive(path_colours, limit)
+
+    # Simulates in the background, cancelling any run which hasn't finished
+    pollJob(runner.submit(simulateRun, drag.get(), values, integratorOptions()))
+
 
-        plot = proj.displayPath(fig)  # Creates the graph
+def simulateRun(job, drag_mode, values, options):
+    """
+    Flies the projectiles of a run in the background, storing the progress in the job
+    :param job: The job running the simulation
+    :type job: jobs.Job
+    :param drag_mode: "no_drag", "drag" or "compare"
+    :type drag_mode: str
+    :param values: The inputs as numbers
+    :type values: dict[str, float]
+    :param options: The integrator options from integratorOptions
+    :type options: dict[str, str | float]
+    :return: the projectiles, with drag first
+    :rtype: list[projectile.Projectile]
+    """
+    return flyProjectiles(drag_mode, values, options, job.update, job.send)
 
+
+def pollJob(job):
+    """
+    Shows the progress of a run and draws the parts of the paths calculated since the last check until it finishes,
+    then shows its results. Checks again at the frame rate of the live graph
+    :param job: The run from runner.submit
+    :type job: jobs.Job
+    """
+    if job is not runner.latest:  # Another run has replaced it
+        return
+    graph_display.drawLive((i, chunk[:, 1:]) for i, chunk in job.receive())
+    if not job.done:
+        run_status.set(f"Running: {job.progress:.0%}" if job is runner.running else "Waiting")
+        root.after(1000 // settings.get("frame_rate", 30), pollJob, job)
+    elif job.cancelled.is_set():
+        run_status.set("Cancelled")
+    elif job.error is not None:
+        run_status.set("")
+        messagebox.showerror("Error", f"Simulation failed: {job.error}")
     else:
-        proj_drag = projectile.ProjectileDrag(**values, colour=colours["pos"])  # Projectile with drag
-        for key in ("mass", "air_density", "drag_coefficient", "area"):
-            values.pop(key)
-        proj_no_drag = projectile.ProjectileNoDrag(**values, colour=colours["neg"])  # Projectile without drag
+        run_status.set("")
+        displayResults(job.result)
+
+
+def cancelRun():
+    """
+    Cancels the run which hasn't finished
+    """
+    runner.cancel()
 
-        for proj in (proj_drag, proj_no_drag):  # Iterates over each projectile
-            while proj.pos[2] >= 0:  # Iterates while the projectile is above the ground
-                proj.move(dt)
 
-        plot = projectile.compare_paths(proj_drag, proj_no_drag, fig)  # Creates the graph with both projectiles
-    displayGraph(fig)  # Displays the graph
+def flyProjectiles(drag_mode, values, options, progress=None, paths=None):
+    """
+    Creates the projectiles for a drag mode and updates their positions until they are on the ground, using the
+    results of previous runs with the same inputs
+    :param drag_mode: "no_drag", "drag" or "compare"
+    :type drag_mode: str
+    :param values: The inputs as numbers
+    :type values: dict[str, float]
+    :param options: The integrator options from integratorOptions
+    :type options: dict[str, str | float]
+    :param progress: Function given the fraction of the flights done, which can raise an exception to stop them
+    :type progress: Callable[[float], None] | None
+    :param paths: Function given the index of the projectile and each chunk of its path as it is calculated
+    :type paths: Callable[[int, np.ndarray], None] | None
+    :return: the projectiles, with drag first
+    :rtype: list[projectile.Projectile]
+    """
+    dt = 0.01
+    # Only stores the samples needed to keep the path within a small fraction of the range without drag
+    recording = {"recording": ("tolerance", settings.get("path_tolerance", 1e-3) * values["velocity"] ** 2
+                               / values["gravity"])}
+    no_drag_values = {key: values[key] for key in projectile.NO_DRAG_ARGUMENTS}
+    flights = 1 if drag_mode != "compare" else 2
+    # The flight time without drag is the longest the flight can be, so it is used for the progress
+    duration = max(projectile.no_drag_results(**no_drag_values)["landing_time"][0], dt)
+
+    def update(chunk):
+        if paths is not None:
+            paths(len(projectiles), chunk)
+        if progress is not None:
+            progress((len(projectiles) + min(chunk[-1, 0] / duration, 1)) / flights)
+
+    projectiles = []
+    if drag_mode != "no_drag":
+        drag_values = {key: values[key] for key in projectile.NO_DRAG_ARGUMENTS + projectile.DRAG_ARGUMENTS}
+        projectiles.append(simulation_cache.fly(projectile.ProjectileDrag, drag_values, dt, options | recording,
+                                                update if progress or paths else None, colour=colours["pos"]))
+    if drag_mode != "drag":
+        projectiles.append(simulation_cache.fly(projectile.ProjectileNoDrag, no_drag_values, dt, recording,
+                                                update if progress or paths else None, colour=colours["neg"]))
+    return projectiles
 
 
-def displayGraph(fig):
+def storeTrajectories(preset_db, name, projectiles):
     """
-    Displays the graph on the graph frame
-    :param fig: matplotlib figure
+    Stores the paths and results of the projectiles of a preset
+    :param preset_db: The database of presets
+    :type preset_db: database.Database
+    :param name: The name of the preset
+    :type name: str
+    :param projectiles: The projectiles which have landed
+    :type projectiles: list[projectile.Projectile]
     """
-    display_frame = Frame(graph_frame, bg=colours["but_bg"])
-    display_frame.place(x=25, y=25, width=970, height=970)
-    canvas = FigureCanvasTkAgg(fig, master=display_frame)  # A tk.DrawingArea.
-    canvas.draw()
-    canvas.get_tk_widget().pack(side=TOP, fill=BOTH, expand=1)  # this is necessary on Windows to prevent
+    for proj in projectiles:
+        preset_db.insertTrajectory(name, "drag" if isinstance(proj, projectile.ProjectileDrag) else "no_drag",
+                                   proj.getState(), projectile.ENGINE_VERSION)
+
+
+def fillResults(path, options):
+    """
+    Simulates the presets without results from the current version of the simulation and stores them, such as when
+    the program starts or a preset is saved. Runs in a background thread, so it uses its own connection to the database
+    :param path: The path of the database
+    :type path: str
+    :param options: The integrator options from integratorOptions
+    :type options: dict[str, str | float]
+    """
+    preset_db = database.Database(path)
+    for name in preset_db.missingResults(projectile.ENGINE_VERSION):
+        record = preset_db.selectPreset(name)
+        values = dict(zip(projectile.NO_DRAG_ARGUMENTS + ("air_density", "mass", "drag_coefficient", "area"),
+                          record[1:]))
+        storeTrajectories(preset_db, name, flyProjectiles(record[0], values, options))
+    preset_db.db.close()
+
+
+def restoreProjectiles(record, trajectories):
+    """
+    Creates the projectiles of a preset from its stored paths without simulating
+    :param record: The values of the preset from Database.selectPreset
+    :type record: tuple[str | float | None]
+    :param trajectories: The stored paths from Database.selectTrajectories
+    :type trajectories: dict[str, dict[str, Any]]
+    :return: the projectiles, with drag first
+    :rtype: list[projectile.Projectile]
+    """
+    values = dict(zip(projectile.NO_DRAG_ARGUMENTS, record[1:8]))
+    projectiles = []
+    if "drag" in trajectories:
+        drag_values = dict(zip(("air_density", "mass", "drag_coefficient", "area"), record[8:]))
+        # Only the stored state is used, so the integrator options of this session aren't given
+        proj = projectile.ProjectileDrag(**values, **drag_values, colour=colours["pos"])
+        proj.setState(trajectories["drag"])
+        projectiles.append(proj)
+    if "no_drag" in trajectories:
+        proj = projectile.ProjectileNoDrag(**values, colour=colours["neg"])
+        proj.setState(trajectories["no_drag"])
+        projectiles.append(proj)
+    return projectiles
+
+
+def displayResults(projectiles):
+    """
+    Shows the results of one projectile, or compares the paths of two projectiles
+    :param projectiles: The projectiles which have landed
+    :type projectiles: list[projectile.Projectile]
+    """
+    if len(projectiles) == 1:
+        proj = projectiles[0]
+        position.set(", ".join(str(round(x, 5)) for x in proj.pos))
+        landing_time.set(str(round(proj.time, 5)))
+        velocity.set(str(round(projectile.mag(proj.v), 5)))
+        displacement.set(str(round(proj.calcDisplacement(), 5)))
+        max_height.set(str(round(proj.max_h, 5)))
+        time.set(str(round(proj.max_t, 5)))
+        # loadOutputFrame()
+
+    graph_display.show(projectiles)  # Replaces the paths on the graph
 
 
 def openDatabaseWindow():
@@ -576,6 +730,11 @@ def openDatabaseWindow():
                     variable.set(value=value)
 
             setupInterface(root)
+            trajectories = db.selectTrajectories(record_name, projectile.ENGINE_VERSION)
+            if trajectories:  # Draws the stored path without simulating
+                displayResults(restoreProjectiles(record, trajectories))
+            else:  # Simulates presets without paths from the current version in the background
+                run()
 
         def previewRecord():
             """
@@ -607,6 +766,11 @@ def openDatabaseWindow():
                 cd_label.config(text="")
                 a_label.config(text="")
 
+            # Presets without paths from the current version are drawn once fillResults has simulated them
+            trajectories = db.selectTrajectories(record_name, projectile.ENGINE_VERSION)
+            if trajectories:  # Draws the stored path without simulating
+                displayResults(restoreProjectiles(record, trajectories))
+
         db_view_frame = Frame(database_win, bg=colours["bg"])
         db_view_frame.place(x=0, y=26, width=800, height=374)
         Label(db_view_frame, bg=colours["bg"], fg=colours["text"], text="View Presets",
@@ -742,6 +906,8 @@ def openDatabaseWindow():
             repeats = db.selectRecord("name", "Presets", {"drag": drag.get(), "EID": eid, "PID": pid, "MID": mid})
             if not repeats:  # If the preset is unique
                 db.insertRecord("Presets", {"name": name, "drag": drag.get(), "EID": eid, "PID": pid, "MID": mid})
+                # Stores the computed paths in the background so the preset can be shown without simulating
+                Thread(target=fillResults, args=("presets.db", integratorOptions()), daemon=True).start()
                 messagebox.showinfo("Preset Saved", "Preset successfully saved")
             else:  # If it already exists
                 messagebox.showerror("Error", f"Invalid value/s: record already exists under '{repeats[0][0]}'")
@@ -770,6 +936,7 @@ def openDatabaseWindow():
 
 if __name__ == "__main__":
     db = database.Database("presets.db")
+    simulation_cache = cache.SimulationCache(path="cache.db")  # Results of previous runs
 
     ctypes.windll.shcore.SetProcessDpiAwareness(1)
 
@@ -791,9 +958,14 @@ if __name__ == "__main__":
     colours.update(themes[last_theme])
     current_theme = StringVar(value=last_theme)  # Variable to store the current theme
     colourblind_mode = BooleanVar(value=last_colourblind)  # Boolean value for if colourblind mode is active
+    # Integrator used for drag calculations
+    current_integrator = StringVar(value=settings.get("integrator", "semi-implicit euler"))
     style = loadTheme()  # Stores the style options for different widgets
 
     graph_frame = Frame(root)
+    display_frame = Frame(graph_frame)
+    display_frame.place(x=25, y=25, width=970, height=970)
+    graph_display = graph.GraphDisplay(display_frame)  # Graph which is reused by every run
 
     # Inputs
     drag = StringVar(value="no_drag")  # Options: "no_drag", "drag", "compare"
@@ -816,7 +988,11 @@ if __name__ == "__main__":
     landing_time = StringVar(value="__________")
     max_height = StringVar(value="__________")
     time = StringVar(value="__________")
+    run_status = StringVar()  # Progress of the run in the background
 
+    runner = jobs.JobRunner()  # Runs simulations in the background
     setupInterface(root)  # Loads the GUI
+    # Fills in the results of presets saved before results were stored
+    Thread(target=fillResults, args=("presets.db", integratorOptions()), daemon=True).start()
 
     root.mainloop()  # Keeps the window open
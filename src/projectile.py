@@ -1,9 +1,19 @@
 # Created: 04/10/23
-# Last edited: 08/12/23 - improved documentation
+# Last edited: 17/10/26 - plotting many paths
 
 import numpy as np                  # Used for vector calculations
 from math import sin, cos           # Used for trig calculations
 from math import radians as rad     # Convert degrees to radians
+from array import array             # Used for storing samples from the kernels
+import integrators                  # Used for adaptive integration
+from concurrent.futures import ProcessPoolExecutor  # Used for running sweeps on many cores
+from multiprocessing import shared_memory           # Used for sending results from other processes
+from mpl_toolkits.mplot3d.art3d import Line3DCollection  # Used for plotting many paths at once
+from matplotlib.colors import to_rgba_array  # Used for colouring each marker
+
+
+# Changed whenever the simulation gives different results, so stored results from older versions are not used
+ENGINE_VERSION = 1
 
 
 def mag(vector):
@@ -17,6 +27,288 @@ def mag(vector):
     return total ** 0.5
 
 
+def _broadcast(*values):
+    """
+    Converts single numbers and arrays into 1D float arrays of the same length
+    :param values: The values, each a number or an array with one value per projectile
+    :return: the arrays
+    :rtype: list[np.ndarray]
+    """
+    return np.broadcast_arrays(*(np.atleast_1d(np.asarray(value, dtype=float)).ravel() for value in values))
+
+
+def _initial_velocity(velocity, ele_angle, azi_angle):
+    """
+    Calculates the initial velocity vectors of many projectiles
+    :param velocity: The magnitudes of the initial velocities
+    :type velocity: np.ndarray
+    :param ele_angle: The elevation angles
+    :type ele_angle: np.ndarray
+    :param azi_angle: The azimuth angles
+    :type azi_angle: np.ndarray
+    :return: the initial velocities, shape (N, 3)
+    :rtype: np.ndarray
+    """
+    ele_angle = np.radians(ele_angle)
+    azi_angle = np.radians(azi_angle)
+    return velocity[:, None] * np.column_stack((np.cos(ele_angle) * np.cos(azi_angle),
+                                                np.cos(ele_angle) * np.sin(azi_angle),
+                                                np.sin(ele_angle)))
+
+
+def lambert_w(x, iterations=12):
+    """
+    Calculates the principal branch of the Lambert W function, the solution w of w * e^w = x
+    :param x: The values, at least -1/e
+    :type x: float | np.ndarray
+    :param iterations: The number of Halley iterations
+    :type iterations: int
+    :return: the values of W(x)
+    :rtype: np.ndarray
+    """
+    x = np.asarray(x, dtype=float)
+    # Starts from the series about the branch point for small x and the asymptotic expansion for large x
+    p = np.sqrt(np.maximum(2 * (np.e * x + 1), 0))
+    w = np.where(x < 1, -1 + p - p ** 2 / 3 + 11 / 72 * p ** 3, np.log(np.maximum(x, 1)))
+    w = np.where(x > 3, np.log(np.maximum(x, 3)) - np.log(np.log(np.maximum(x, 3))), w)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(iterations):
+            ew = np.exp(w)
+            f = w * ew - x
+            new_w = w - f / (ew * (w + 1) - (w + 2) * f / (2 * w + 2))
+            w = np.where(np.isfinite(new_w), new_w, w)
+    return w
+
+
+class TrajectoryBuffer:
+    def __init__(self, capacity=256):
+        """
+        Stores the times and coordinates visited by a projectile in one float64 array which doubles in size when full
+        :param capacity: The number of samples which can be stored before the array is resized
+        :type capacity: int
+        """
+        self._data = np.empty((max(capacity, 1), 4))  # Columns: time, x, y, z
+        self._n = 0  # Number of samples stored
+
+    def __len__(self):
+        return self._n
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.data, dtype=dtype)
+
+    def reserve(self, n):
+        """
+        Makes sure there is space for n more samples, doubling the size of the array until there is
+        :param n: The number of samples to be added
+        :type n: int
+        """
+        capacity = len(self._data)
+        if self._n + n <= capacity:
+            return
+        while self._n + n > capacity:
+            capacity *= 2
+        data = np.empty((capacity, 4))
+        data[:self._n] = self._data[:self._n]
+        self._data = data
+
+    def append(self, time, pos):
+        """
+        Adds one sample to the end of the trajectory
+        :param time: The time of the sample
+        :type time: float
+        :param pos: The position of the projectile
+        :type pos: Iterable[float]
+        """
+        if self._n == len(self._data):
+            self.reserve(1)
+        row = self._data[self._n]
+        row[0] = time
+        row[1:] = pos
+        self._n += 1
+
+    def extend(self, times, positions):
+        """
+        Adds several samples to the end of the trajectory
+        :param times: The times of the samples, shape (n,)
+        :type times: np.ndarray
+        :param positions: The positions of the projectile, shape (n, 3)
+        :type positions: np.ndarray
+        """
+        n = len(times)
+        self.reserve(n)
+        self._data[self._n:self._n + n, 0] = times
+        self._data[self._n:self._n + n, 1:] = positions
+        self._n += n
+
+    def clear(self):
+        """
+        Removes every sample while keeping the allocated array
+        """
+        self._n = 0
+
+    def _view(self, columns):
+        view = self._data[:self._n, columns]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def data(self):
+        """
+        Read-only view of the samples as rows of (time, x, y, z), shape (n, 4)
+        """
+        return self._view(slice(None))
+
+    @property
+    def times(self):
+        """
+        Read-only view of the sample times, shape (n,)
+        """
+        return self._view(0)
+
+    @property
+    def positions(self):
+        """
+        Read-only view of the sample coordinates, shape (n, 3)
+        """
+        return self._view(slice(1, None))
+
+
+# Recording policies, which choose the samples of a flight that are stored. Each is given the rows after the last stored
+# sample, with that sample first, and the rows which must be kept
+class Recorder:
+    def start(self):
+        """
+        Called when a new path is started
+        """
+
+    def select(self, times, positions, keep):
+        """
+        Chooses the rows which are stored
+        :param times: The times, starting with the last stored sample
+        :type times: np.ndarray
+        :param positions: The positions at each time, shape (n, 3)
+        :type positions: np.ndarray
+        :param keep: Whether each row must be stored
+        :type keep: np.ndarray
+        :return: whether each row is stored
+        :rtype: np.ndarray
+        """
+        return np.ones(len(times), dtype=bool)
+
+    def policy(self):
+        """
+        Gets the name and value of the policy, which give the same recorder when passed to recorder
+        :return: the name in RECORDERS and the value, or None if the policy isn't in RECORDERS
+        :rtype: tuple[str, float] | None
+        """
+        return None
+
+
+class RecordEvery(Recorder):
+    def __init__(self, steps):
+        """
+        Stores every nth step
+        :param steps: The number of steps between stored samples
+        :type steps: int
+        """
+        if steps < 1:
+            raise ValueError("Steps must be at least 1")
+        self.steps = int(steps)
+        self.count = 0  # Steps since the start of the path
+
+    def start(self):
+        self.count = 0
+
+    def policy(self):
+        return "every", self.steps
+
+    def select(self, times, positions, keep):
+        step = self.count + np.arange(len(times))
+        self.count += len(times) - 1
+        return keep | (step % self.steps == 0)
+
+
+class RecordInterval(Recorder):
+    def __init__(self, interval):
+        """
+        Stores the first sample in each interval of time
+        :param interval: The time between stored samples
+        :type interval: float
+        """
+        if interval <= 0:
+            raise ValueError("Interval must be positive")
+        self.interval = interval
+
+    def policy(self):
+        return "interval", float(self.interval)
+
+    def select(self, times, positions, keep):
+        bins = np.floor(times / self.interval)
+        return keep | (np.diff(bins, prepend=bins[0]) > 0)
+
+
+class RecordTolerance(Recorder):
+    def __init__(self, tolerance):
+        """
+        Stores the fewest samples so every sample left out is within a distance of the straight lines between the
+        stored samples, using the Douglas-Peucker algorithm. The last sample of each part is stored
+        :param tolerance: The largest distance from the stored path
+        :type tolerance: float
+        """
+        if tolerance <= 0:
+            raise ValueError("Tolerance must be positive")
+        self.tolerance = tolerance
+
+    def policy(self):
+        return "tolerance", float(self.tolerance)
+
+    def select(self, times, positions, keep):
+        stored = keep.copy()
+        stored[[0, -1]] = True
+        ends = np.flatnonzero(stored)
+        stack = list(zip(ends[:-1], ends[1:]))
+        while stack:
+            i, j = stack.pop()
+            if j - i < 2:
+                continue
+            # Distance of each sample between i and j from the line between them
+            a, ab = positions[i], positions[j] - positions[i]
+            ap = positions[i + 1:j] - a
+            length = ab @ ab
+            u = np.clip(ap @ ab / length, 0, 1) if length else np.zeros(j - i - 1)
+            distance = np.linalg.norm(ap - u[:, None] * ab, axis=1)
+            k = np.argmax(distance)
+            if distance[k] > self.tolerance:
+                k += i + 1
+                stored[k] = True
+                stack += [(i, k), (k, j)]
+        return stored
+
+
+# Recording policies by name, so they can be chosen with (name, value) such as ("tolerance", 0.01)
+RECORDERS = {
+    "every": RecordEvery,
+    "interval": RecordInterval,
+    "tolerance": RecordTolerance
+}
+
+
+def recorder(recording):
+    """
+    Creates the recorder of a recording policy
+    :param recording: None to store every sample, the name of the policy in RECORDERS and its value, or a Recorder
+    :type recording: tuple[str, float] | Recorder | None
+    :return: the recorder, or None to store every sample
+    :rtype: Recorder | None
+    """
+    if recording is None or isinstance(recording, Recorder):
+        return recording
+    name, value = recording
+    if name not in RECORDERS:
+        raise ValueError(f"Unknown recording policy '{name}'")
+    return RECORDERS[name](value)
+
+
 # Classes for projectiles
 class Projectile:
     def __init__(self, velocity, ele_angle, azi_angle, x, y, z, gravity, **kwargs):
@@ -36,8 +328,12 @@ class Projectile:
         :type z: float | int
         :param gravity: The magnitude of acceleration due to gravity
         :type gravity: float | int
-        :param kwargs: Appearance options for the scatter graph
+        :param kwargs: Appearance options for the scatter graph, and the recording policy given to recorder as
+            recording
         """
+        self.velocity = velocity  # Launch speed
+        self.ele_angle = ele_angle
+        self.azi_angle = azi_angle
         self.u = velocity * np.array([cos(rad(ele_angle)) * cos(rad(azi_angle)),
                                       cos(rad(ele_angle)) * sin(rad(azi_angle)),
                                       sin(rad(ele_angle))])
@@ -50,12 +346,22 @@ class Projectile:
 
         self.time = 0
         self.landing_time = 0
+        self.landed = False  # Whether the projectile has reached the ground
 
         self.v = self.u  # Current velocity
 
         self.colour = kwargs.get("colour", "#FF0000")
         self.marker = kwargs.get("marker", "o")
-        self.coords = [[x, y, z]]  # List storing all coordinates visited
+        self.recording = recorder(kwargs.get("recording"))  # Chooses which samples are stored, or None for all
+        self.path = TrajectoryBuffer()  # Stores all times and coordinates visited
+        self.path.append(0, self.pos0)
+
+    @property
+    def coords(self):
+        """
+        Read-only view of all coordinates visited, shape (n, 3)
+        """
+        return self.path.positions
 
     def calcDisplacement(self):
         """
@@ -66,38 +372,202 @@ class Projectile:
         s = self.pos - self.pos0
         return mag(s)
 
+    def record(self, times, positions, keep=()):
+        """
+        Stores samples of the flight path using the recording policy
+        :param times: The times of the samples
+        :type times: np.ndarray
+        :param positions: The positions at each time, shape (n, 3)
+        :type positions: np.ndarray
+        :param keep: The times of samples which are always stored, such as the apex and landing
+        :type keep: Iterable[float]
+        """
+        if self.recording is None:
+            self.path.extend(times, positions)
+            return
+        if not len(times):
+            return
+        if not len(self.path):  # The first sample is always stored
+            self.recording.start()
+            self.path.append(times[0], positions[0])
+            times, positions = times[1:], positions[1:]
+        last = self.path.data[-1]
+        times = np.append(last[0], times)
+        positions = np.vstack((last[1:], positions))
+        stored = self.recording.select(times, positions, np.isin(times, list(keep)))
+        stored[0] = False
+        self.path.extend(times[stored], positions[stored])
+
+    def getState(self):
+        """
+        Gets the results of the flight so they can be stored and restored with setState
+        :return: the path, position, velocity, time, max height and time of max height
+        :rtype: dict[str, np.ndarray | float]
+        """
+        return {
+            "path": self.path.data.copy(),
+            "pos": np.array(self.pos, dtype=float),
+            "v": np.array(self.v, dtype=float),
+            "time": float(self.time),
+            "max_h": float(self.max_h),
+            "max_t": float(self.max_t)
+        }
+
+    def setState(self, state):
+        """
+        Restores the results of a flight from getState instead of flying again, so the projectile has landed
+        :param state: The state from getState
+        :type state: dict[str, np.ndarray | float]
+        """
+        self.landed = True
+        self.path.clear()
+        self.path.extend(state["path"][:, 0], state["path"][:, 1:])
+        self.pos = np.array(state["pos"], dtype=float)
+        self.v = np.array(state["v"], dtype=float)
+        self.time = float(state["time"])
+        self.max_h = float(state["max_h"])
+        self.max_t = float(state["max_t"])
+
+    def fly(self, dt):
+        """
+        Updates the position until the projectile is on the ground
+        :param dt: the interval between updating position
+        :type dt: float
+        """
+        while self.pos[2] >= 0:
+            self.move(dt)
+        self.landed = True
+
+    def stream(self, dt, chunk_size=1024, retain=True):
+        """
+        Flies the projectile, giving the flight path in chunks as it is calculated so it can be used before the
+        projectile lands. If the path is not retained, memory use depends on the chunk size and not the length of the
+        flight
+        :param dt: the interval between updating position
+        :type dt: float
+        :param chunk_size: The number of rows in each chunk; only the last chunk can be shorter
+        :type chunk_size: int
+        :param retain: Whether the path is stored as well, using the recording policy; if False only the landing point
+            is kept in path
+        :type retain: bool
+        :return: chunks of rows of (time, x, y, z), starting with the current position, or none if the projectile has
+            landed or is below the ground
+        :rtype: Iterator[np.ndarray]
+        """
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be at least 1")
+        if self.landed or self.pos[2] < 0:
+            return
+        chunk = np.empty((chunk_size, 4))
+        chunk[0] = self.time, *self.pos
+        filled = 1
+        for rows in self._chunks(dt, chunk_size):
+            if retain:  # The last sample of each part and the apex are always stored
+                self.record(rows[:, 0], rows[:, 1:], (self.max_t, self.time))
+            while len(rows):
+                n = min(chunk_size - filled, len(rows))
+                chunk[filled:filled + n] = rows[:n]
+                filled += n
+                rows = rows[n:]
+                if filled == chunk_size:
+                    yield chunk
+                    chunk = np.empty((chunk_size, 4))
+                    filled = 0
+        if filled:
+            yield chunk[:filled]
+        if not retain:
+            self.path.clear()
+            self.path.append(self.time, self.pos)
+
     def displayPath(self, fig):
         """
-        Plots the flight path on a 3D scatter graph
+        Plots the flight path on a 3D graph
         :param fig: Matplotlib figure
         :return: Returns the Matplotlib subplot
         """
-        ax = fig.add_subplot(111, projection='3d')
+        return plot_paths([self], fig)
 
-        n = (len(self.coords) // 20) + 1
 
-        max_coords = max([max(row[0] for row in self.coords),  # Finds the max coordinate
-                          max(row[1] for row in self.coords),
-                          max(row[2] for row in self.coords)])
-
-        ax.scatter([row[0] for row in self.coords][::n],
-                   [row[1] for row in self.coords][::n],
-                   [row[2] for row in self.coords][::n],
-                   c=self.colour, marker=self.marker)
+# Projectiles whose position is known at any time, so the whole path can be calculated at once. Subclasses set
+# landing_time and landing_pos, and provide position(time)
+class ProjectileAnalytic(Projectile):
+    def move(self, dt):
+        """
+        Updates the position and time, storing the position with the recording policy. Policies which compare
+        samples, such as tolerance, only see one step at a time so they store every step
+        :param dt: the interval between updating position
+        :type dt: float
+        """
+        self.pos = self.position(self.time)
+        self.record(np.array([self.time]), self.pos[None])
+        self.time += dt
 
-        ax.set_xlabel('X Axis / m')
-        ax.set_ylabel('Y Axis / m')
-        ax.set_zlabel('Z Axis / m')
+    def trajectory(self, dt=None, n_samples=None):
+        """
+        Calculates the whole flight path at once, ending exactly at the landing time. The path replaces any
+        coordinates already stored
+        :param dt: the interval between samples
+        :type dt: float
+        :param n_samples: the number of evenly spaced samples, used instead of dt
+        :type n_samples: int
+        :return: the coordinates visited, shape (n, 3)
+        :rtype: np.ndarray
+        """
+        if n_samples is not None:
+            times = np.linspace(0, self.landing_time, max(n_samples, 2))
+        else:
+            # Stops just short of the landing time so it is not repeated when appended
+            times = np.append(np.arange(0, self.landing_time - dt * 1e-6, dt), self.landing_time)
+        if self.recording is not None and times[0] < self.max_t < self.landing_time:
+            times = np.union1d(times, [self.max_t])  # So the apex can be stored
+        self.path.clear()
+        self.record(times, self.position(times[:, None]), (self.max_t, self.landing_time))
+        self.pos = self.landing_pos
+        self.time = self.landing_time
+        self.landed = True
+        return self.coords
 
-        # Keeps the same scale with axes
-        ax.set_xlim3d(0, max_coords)
-        ax.set_ylim3d(0, max_coords)
-        ax.set_zlim3d(0, max_coords)
+    def fly(self, dt):
+        """
+        Calculates the flight path up to the landing time
+        :param dt: the interval between samples
+        :type dt: float
+        """
+        self.trajectory(dt)
 
-        return ax
+    def _chunks(self, dt, size):
+        """
+        Calculates the flight path a part at a time, at the same times as trajectory
+        :param dt: the interval between samples
+        :type dt: float
+        :param size: the number of samples in each part
+        :type size: int
+        :return: parts of the path after the current time as rows of (time, x, y, z)
+        :rtype: Iterator[np.ndarray]
+        """
+        start = self.time
+        end = self.landing_time - dt * 1e-6  # Stops just short of the landing time so it is not repeated
+        apex = self.max_t if self.recording is not None and start < self.max_t < self.landing_time else None
+        i = 1
+        while True:
+            times = start + dt * np.arange(i, i + size)
+            times = times[times < end]
+            i += size
+            last = len(times) < size
+            if last:
+                times = np.append(times, self.landing_time)
+                self.pos = self.landing_pos
+                self.time = self.landing_time
+                self.landed = True
+            if apex is not None and apex <= times[-1]:
+                times = np.union1d(times, [apex])  # So the apex can be stored
+                apex = None
+            yield np.column_stack((times, self.position(times[:, None])))
+            if last:
+                break
 
 
-class ProjectileNoDrag(Projectile):
+class ProjectileNoDrag(ProjectileAnalytic):
     def __init__(self, velocity, ele_angle, azi_angle, x, y, z, gravity, **kwargs):
         """
         Creates an instance of the object
@@ -134,15 +604,118 @@ class ProjectileNoDrag(Projectile):
         """
         return self.pos0 + self.u * time + 0.5 * self.g * time ** 2
 
-    def move(self, dt):
+    def calcVelocity(self, time):
         """
-        Updates the position and time
-        :param dt: the interval between updating position
-        :type dt: float
+        Calculates the velocity at a given time
+        :param time: the time since projection
+        :type time: float
         """
-        self.pos = self.position(self.time)
-        self.time += dt
-        self.coords.append([*self.pos])
+        self.v = self.u + self.g * time
+
+
+def trajectories_no_drag(velocity, ele_angle, azi_angle, x, y, z, gravity, n_samples=100):
+    """
+    Calculates the flight paths of many projectiles without drag at once. Each argument is either a single number or
+    an array with one value per projectile. Every path has the same number of samples, evenly spaced from launch to
+    landing
+    :param velocity: The magnitudes of the initial velocities
+    :param ele_angle: The elevation angles
+    :param azi_angle: The azimuth angles
+    :param x: The initial x coordinates
+    :param y: The initial y coordinates
+    :param z: The initial z coordinates (heights)
+    :param gravity: The magnitudes of acceleration due to gravity
+    :param n_samples: The number of samples in each path
+    :type n_samples: int
+    :return: the sample times, shape (N, n_samples), and coordinates, shape (N, n_samples, 3)
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+    velocity, ele_angle, azi_angle, x, y, z, gravity = _broadcast(velocity, ele_angle, azi_angle, x, y, z, gravity)
+    u = _initial_velocity(velocity, ele_angle, azi_angle)
+    pos0 = np.column_stack((x, y, z))
+    g = np.column_stack((np.zeros_like(gravity), np.zeros_like(gravity), -gravity))
+
+    landing_time = (u[:, 2] + (u[:, 2] ** 2 + 2 * gravity * z) ** 0.5) / gravity
+    times = landing_time[:, None] * np.linspace(0, 1, max(n_samples, 2))
+    t = times[:, :, None]
+    positions = pos0[:, None] + u[:, None] * t + 0.5 * g[:, None] * t ** 2
+    return times, positions
+
+
+def no_drag_results(velocity, ele_angle, azi_angle, x, y, z, gravity):
+    """
+    Calculates the results of many projectiles without drag at once. Each argument is either a single number or an
+    array with one value per projectile
+    :param velocity: The magnitudes of the initial velocities
+    :param ele_angle: The elevation angles
+    :param azi_angle: The azimuth angles
+    :param x: The initial x coordinates
+    :param y: The initial y coordinates
+    :param z: The initial z coordinates (heights)
+    :param gravity: The magnitudes of acceleration due to gravity
+    :return: arrays of the landing time, landing position, max height, time of max height, and final speed
+    :rtype: dict[str, np.ndarray]
+    """
+    velocity, ele_angle, azi_angle, x, y, z, gravity = _broadcast(velocity, ele_angle, azi_angle, x, y, z, gravity)
+    u = _initial_velocity(velocity, ele_angle, azi_angle)
+    max_t = np.maximum(u[:, 2], 0) / gravity  # Projectiles launched downwards are highest at launch
+    final_vz = (u[:, 2] ** 2 + 2 * gravity * z) ** 0.5
+    landing_time = (u[:, 2] + final_vz) / gravity
+    return {
+        "landing_time": landing_time,
+        "landing_pos": np.column_stack((x + u[:, 0] * landing_time, y + u[:, 1] * landing_time,
+                                        np.zeros_like(z))),
+        "max_h": z + u[:, 2] * max_t - 0.5 * gravity * max_t ** 2,
+        "max_t": max_t,
+        "final_speed": (u[:, 0] ** 2 + u[:, 1] ** 2 + final_vz ** 2) ** 0.5
+    }
+
+
+class ProjectileLinearDrag(ProjectileAnalytic):
+    def __init__(self, velocity, ele_angle, azi_angle, x, y, z, gravity, mass, drag_constant, **kwargs):
+        """
+        Creates a projectile with drag proportional to its velocity, F = -bv, which has an exact solution
+        :param velocity: The magnitude of the initial velocity
+        :type velocity: float | int
+        :param ele_angle: The elevation angle
+        :type ele_angle: float | int
+        :param azi_angle: The azimuth angle
+        :type azi_angle: float | int
+        :param x: The initial x coordinate
+        :type x: float | int
+        :param y: The initial y coordinate
+        :type y: float | int
+        :param z: The initial z coordinate (height)
+        :type z: float | int
+        :param gravity: The magnitude of acceleration due to gravity
+        :type gravity: float | int
+        :param mass: The mass of the projectile
+        :type mass: float | int
+        :param drag_constant: The drag force per unit velocity, b
+        :type drag_constant: float | int
+        :param kwargs: Appearance options for the scatter graph
+        """
+        super().__init__(velocity, ele_angle, azi_angle, x, y, z, gravity, **kwargs)
+        self.m = mass  # Mass
+        self.b = drag_constant  # Drag constant
+        self.tau = mass / drag_constant  # Time constant of the drag
+        self.v_inf = self.g * self.tau  # Terminal velocity
+
+        results = linear_drag_results(velocity, ele_angle, azi_angle, x, y, z, gravity, mass, drag_constant)
+        self.max_t = results["max_t"][0]
+        self.max_h = results["max_h"][0]
+        self.landing_time = results["landing_time"][0]
+        self.landing_pos = results["landing_pos"][0]
+        self.calcVelocity(self.landing_time)
+
+    def position(self, time):
+        """
+        Calculates the position of the projectile at a given time
+        :param time: the current time
+        :type time: float | int
+        :return: the current position
+        """
+        return self.pos0 + self.v_inf * time - self.tau * (self.u - self.v_inf) * np.expm1(-time / self.tau)
 
     def calcVelocity(self, time):
         """
@@ -150,12 +723,203 @@ class ProjectileNoDrag(Projectile):
         :param time: the time since projection
         :type time: float
         """
-        self.v = self.u + self.g * time
+        self.v = self.v_inf + (self.u - self.v_inf) * np.exp(-time / self.tau)
+
+
+def linear_drag_results(velocity, ele_angle, azi_angle, x, y, z, gravity, mass, drag_constant):
+    """
+    Calculates the exact results of many projectiles with linear drag at once. The landing time is found with the
+    Lambert W function. Each argument is either a single number or an array with one value per projectile
+    :param velocity: The magnitudes of the initial velocities
+    :param ele_angle: The elevation angles
+    :param azi_angle: The azimuth angles
+    :param x: The initial x coordinates
+    :param y: The initial y coordinates
+    :param z: The initial z coordinates (heights)
+    :param gravity: The magnitudes of acceleration due to gravity
+    :param mass: The masses of the projectiles
+    :param drag_constant: The drag forces per unit velocity
+    :return: arrays of the landing time, landing position, max height, time of max height, and final speed
+    :rtype: dict[str, np.ndarray]
+    """
+    velocity, ele_angle, azi_angle, x, y, z, gravity, mass, drag_constant = _broadcast(
+        velocity, ele_angle, azi_angle, x, y, z, gravity, mass, drag_constant)
+    u = _initial_velocity(velocity, ele_angle, azi_angle)
+    pos0 = np.column_stack((x, y, z))
+    tau = mass / drag_constant
+    v_inf = np.column_stack((np.zeros_like(tau), np.zeros_like(tau), -gravity * tau))
+
+    def position(time):
+        t = time[:, None]
+        return pos0 + v_inf * t - tau[:, None] * (u - v_inf) * np.expm1(-t / tau[:, None])
+
+    max_t = tau * np.log1p(np.maximum(u[:, 2], 0) / (gravity * tau))
+    # Solves z0 - g tau t + tau (uz + g tau)(1 - e^(-t / tau)) = 0 as s = b - c e^(-s) with s = t / tau
+    c = (u[:, 2] + gravity * tau) / (gravity * tau)
+    b = z / (gravity * tau ** 2) + c
+    landing_time = tau * (b + lambert_w(-c * np.exp(-b)))
+    final_velocity = v_inf + (u - v_inf) * np.exp(-landing_time / tau)[:, None]
+    return {
+        "landing_time": landing_time,
+        "landing_pos": position(landing_time),
+        "max_h": position(max_t)[:, 2],
+        "max_t": max_t,
+        "final_speed": np.sqrt(np.einsum("ij,ij->i", final_velocity, final_velocity))
+    }
+
+
+def vertical_drag_results(velocity, x, y, z, gravity, mass, air_density, drag_coefficient, area):
+    """
+    Calculates the exact results of many projectiles with drag, as in ProjectileDrag, launched straight up. Each
+    argument is either a single number or an array with one value per projectile
+    :param velocity: The magnitudes of the initial velocities, upwards
+    :param x: The initial x coordinates
+    :param y: The initial y coordinates
+    :param z: The initial z coordinates (heights)
+    :param gravity: The magnitudes of acceleration due to gravity
+    :param mass: The masses of the projectiles
+    :param air_density: The air densities of the medium
+    :param drag_coefficient: The drag coefficients of the projectiles
+    :param area: The surface areas of the projectiles
+    :return: arrays of the landing time, landing position, max height, time of max height, and final speed
+    :rtype: dict[str, np.ndarray]
+    """
+    velocity, x, y, z, gravity, mass, air_density, drag_coefficient, area = _broadcast(
+        velocity, x, y, z, gravity, mass, air_density, drag_coefficient, area)
+    k = 0.5 * area * drag_coefficient * air_density / mass
+    v_t = np.sqrt(gravity / k)  # Terminal velocity
+
+    max_t = v_t / gravity * np.arctan(velocity / v_t)
+    max_h = z + v_t ** 2 / (2 * gravity) * np.log1p((velocity / v_t) ** 2)
+    # Falls from rest at the max height; the fall time is (v_t / g) arcosh(e^a)
+    a = gravity * max_h / v_t ** 2
+    fall_time = v_t / gravity * (a + np.log1p(np.sqrt(-np.expm1(-2 * a))))
+    return {
+        "landing_time": max_t + fall_time,
+        "landing_pos": np.column_stack((x, y, np.zeros_like(z))),
+        "max_h": max_h,
+        "max_t": max_t,
+        "final_speed": v_t * np.sqrt(-np.expm1(-2 * a))
+    }
+
+
+def drag_kernel_semi_implicit_euler(t, state, dt, gz, k, samples, max_steps=2 ** 62):
+    """
+    Moves a projectile with drag using semi-implicit Euler steps until it is below the ground. The state is kept in
+    floats and the steps follow integrators.semi_implicit_euler with ProjectileDrag.derivative, agreeing to rounding
+    (about 1e-12 m) as the dot product in NumPy can round the squared speed differently
+    :param t: The initial time
+    :type t: float
+    :param state: The initial state (x, y, z, vx, vy, vz)
+    :type state: tuple[float, ...]
+    :param dt: The size of each step
+    :type dt: float
+    :param gz: The vertical component of gravity
+    :type gz: float
+    :param k: The drag force per unit mass per speed squared
+    :type k: float
+    :param samples: Array which (t, x, y, z) is added to after every step
+    :type samples: array
+    :param max_steps: The most steps taken before returning, so a long flight can be run in parts
+    :type max_steps: int
+    :return: the time and state at the start and end of the last step, and the step where the projectile started
+        falling as (index, (time, state) at the start, (time, state) at the end), or None. If the projectile has not
+        landed after max_steps, the start is None and the end is the time and state to continue from
+    :rtype: tuple
+    """
+    x, y, z, vx, vy, vz = state
+    extend = samples.extend
+    apex = None
+    for _ in range(max_steps):
+        speed = (vx * vx + vy * vy + vz * vz) ** 0.5
+        nvx = vx + (0.0 - k * vx * speed) * dt
+        nvy = vy + (0.0 - k * vy * speed) * dt
+        nvz = vz + (gz - k * vz * speed) * dt
+        nx = x + nvx * dt
+        ny = y + nvy * dt
+        nz = z + nvz * dt
+        nt = t + dt
+        extend((nt, nx, ny, nz))
+        if vz >= 0 > nvz and apex is None:
+            apex = (len(samples) // 4 - 1, (t, (x, y, z, vx, vy, vz)), (nt, (nx, ny, nz, nvx, nvy, nvz)))
+        if nz < 0:
+            return (t, (x, y, z, vx, vy, vz)), (nt, (nx, ny, nz, nvx, nvy, nvz)), apex
+        t, x, y, z, vx, vy, vz = nt, nx, ny, nz, nvx, nvy, nvz
+    return None, (t, (x, y, z, vx, vy, vz)), apex
+
+
+def drag_kernel_rk4(t, state, dt, gz, k, samples, max_steps=2 ** 62):
+    """
+    Moves a projectile with drag using Runge-Kutta steps until it is below the ground. The state is kept in floats
+    and the steps follow integrators.rk4 with ProjectileDrag.derivative, agreeing to rounding (about 1e-12 m) as the
+    dot product in NumPy can round the squared speed differently
+    :param t: The initial time
+    :type t: float
+    :param state: The initial state (x, y, z, vx, vy, vz)
+    :type state: tuple[float, ...]
+    :param dt: The size of each step
+    :type dt: float
+    :param gz: The vertical component of gravity
+    :type gz: float
+    :param k: The drag force per unit mass per speed squared
+    :type k: float
+    :param samples: Array which (t, x, y, z) is added to after every step
+    :type samples: array
+    :param max_steps: The most steps taken before returning, so a long flight can be run in parts
+    :type max_steps: int
+    :return: the time and state at the start and end of the last step, and the step where the projectile started
+        falling as (index, (time, state) at the start, (time, state) at the end), or None. If the projectile has not
+        landed after max_steps, the start is None and the end is the time and state to continue from
+    :rtype: tuple
+    """
+    x, y, z, vx, vy, vz = state
+    extend = samples.extend
+    apex = None
+    half = 0.5 * dt
+    sixth = dt / 6
+    for _ in range(max_steps):
+        s = (vx * vx + vy * vy + vz * vz) ** 0.5
+        ax1, ay1, az1 = 0.0 - k * vx * s, 0.0 - k * vy * s, gz - k * vz * s
+        vx2, vy2, vz2 = vx + half * ax1, vy + half * ay1, vz + half * az1
+        s = (vx2 * vx2 + vy2 * vy2 + vz2 * vz2) ** 0.5
+        ax2, ay2, az2 = 0.0 - k * vx2 * s, 0.0 - k * vy2 * s, gz - k * vz2 * s
+        vx3, vy3, vz3 = vx + half * ax2, vy + half * ay2, vz + half * az2
+        s = (vx3 * vx3 + vy3 * vy3 + vz3 * vz3) ** 0.5
+        ax3, ay3, az3 = 0.0 - k * vx3 * s, 0.0 - k * vy3 * s, gz - k * vz3 * s
+        vx4, vy4, vz4 = vx + dt * ax3, vy + dt * ay3, vz + dt * az3
+        s = (vx4 * vx4 + vy4 * vy4 + vz4 * vz4) ** 0.5
+        ax4, ay4, az4 = 0.0 - k * vx4 * s, 0.0 - k * vy4 * s, gz - k * vz4 * s
+
+        nx = x + sixth * (vx + 2 * vx2 + 2 * vx3 + vx4)
+        ny = y + sixth * (vy + 2 * vy2 + 2 * vy3 + vy4)
+        nz = z + sixth * (vz + 2 * vz2 + 2 * vz3 + vz4)
+        nvx = vx + sixth * (ax1 + 2 * ax2 + 2 * ax3 + ax4)
+        nvy = vy + sixth * (ay1 + 2 * ay2 + 2 * ay3 + ay4)
+        nvz = vz + sixth * (az1 + 2 * az2 + 2 * az3 + az4)
+        nt = t + dt
+        extend((nt, nx, ny, nz))
+        if vz >= 0 > nvz and apex is None:
+            apex = (len(samples) // 4 - 1, (t, (x, y, z, vx, vy, vz)), (nt, (nx, ny, nz, nvx, nvy, nvz)))
+        if nz < 0:
+            return (t, (x, y, z, vx, vy, vz)), (nt, (nx, ny, nz, nvx, nvy, nvz)), apex
+        t, x, y, z, vx, vy, vz = nt, nx, ny, nz, nvx, nvy, nvz
+    return None, (t, (x, y, z, vx, vy, vz)), apex
+
+
+# Arguments of ProjectileDrag which flySensitivity finds the derivatives of the results with respect to
+SENSITIVITY_PARAMETERS = ("velocity", "ele_angle", "azi_angle", "drag_coefficient", "area", "mass", "air_density")
+
+
+# Kernels which run a whole flight with drag in one call, for the integrators which have one
+KERNELS = {
+    "semi-implicit euler": drag_kernel_semi_implicit_euler,
+    "rk4": drag_kernel_rk4
+}
 
 
 class ProjectileDrag(Projectile):
     def __init__(self, velocity, ele_angle, azi_angle, x, y, z, gravity, mass, air_density, drag_coefficient, area,
-                 **kwargs):
+                 integrator="semi-implicit euler", rtol=1e-6, atol=1e-6, **kwargs):
         """
         Creates an instance of the object
         :param velocity: The magnitude of the initial velocity
@@ -180,19 +944,226 @@ class ProjectileDrag(Projectile):
         :type drag_coefficient: float | int
         :param area: The surface area of the projectile
         :type area: float | int
+        :param integrator: The name of the integrator in integrators.INTEGRATORS
+        :type integrator: str
+        :param rtol: The relative tolerance used by adaptive integrators
+        :type rtol: float
+        :param atol: The absolute tolerance used by adaptive integrators
+        :type atol: float
         :param kwargs: Appearance options for the scatter graph
         """
         super().__init__(velocity, ele_angle, azi_angle, x, y, z, gravity, **kwargs)
+        if integrator not in integrators.INTEGRATORS:
+            raise ValueError(f"Unknown integrator '{integrator}'")
+        self.integrator = integrator
+        self.step = integrators.INTEGRATORS[integrator]  # Function which moves the state by one step
+        self.rtol = rtol
+        self.atol = atol
+
         self.m = mass  # Mass
         self.rho = air_density  # Air density
         self.cd = drag_coefficient  # Drag coefficient
         self.area = area  # Surface area
 
         self.p = self.m * self.v  # Momentum of the projectile
+        self.k = 0.5 * self.area * self.cd * self.rho / self.m  # Drag force per unit mass per speed squared
+        self.steps = 0  # Number of steps taken by the last adaptive flight
+        self.events = []  # Events which happened during the last flight as (name, time, state)
+        # Derivatives of the drag constant with respect to each of SENSITIVITY_PARAMETERS
+        self.dk = np.array([0, 0, 0, 0.5 * self.area * self.rho / self.m, 0.5 * self.cd * self.rho / self.m,
+                            -self.k / self.m, 0.5 * self.area * self.cd / self.m])
+
+    def derivative(self, time, state):
+        """
+        Calculates the rate of change of the state [x, y, z, vx, vy, vz]
+        :param time: the current time
+        :type time: float
+        :param state: the position and velocity
+        :type state: np.ndarray
+        :return: the velocity and acceleration
+        :rtype: np.ndarray
+        """
+        v = state[3:]
+        return np.concatenate((v, self.g - self.k * v * (v @ v) ** 0.5))
+
+    def setState(self, state):
+        """
+        Restores the results of a flight from getState instead of flying again
+        :param state: The state from getState
+        :type state: dict[str, np.ndarray | float]
+        """
+        super().setState(state)
+        self.p = self.m * self.v
+
+    def sensitivityDerivative(self, time, state):
+        """
+        Calculates the rate of change of the state and of its derivatives with respect to SENSITIVITY_PARAMETERS,
+        using the tangent-linear equations of motion
+        :param time: the current time
+        :type time: float
+        :param state: the position and velocity, followed by the 6x7 matrix of their derivatives flattened
+        :type state: np.ndarray
+        :return: the rate of change of the state
+        :rtype: np.ndarray
+        """
+        v = state[3:6]
+        s_v = state[6:].reshape(6, len(SENSITIVITY_PARAMETERS))[3:]  # Derivatives of the velocity
+        speed = (v @ v) ** 0.5
+        rate = np.empty_like(state)
+        rate[:6] = self.derivative(time, state[:6])
+        ds = rate[6:].reshape(6, -1)
+        ds[:3] = s_v
+        # The acceleration -k |v| v changes with the velocity and the drag constant k
+        ds[3:] = -self.k * speed * s_v - np.outer(v, speed * self.dk)
+        if speed:
+            ds[3:] -= self.k / speed * np.outer(v, v @ s_v)
+        return rate
+
+    def flySensitivity(self, dt):
+        """
+        Updates the position until the projectile is on the ground, integrating the derivatives of the state with
+        respect to SENSITIVITY_PARAMETERS alongside it, so one flight gives the Jacobian of the results. Uses RK4
+        whatever the chosen integrator is, and must be called before the projectile has moved. Angles are in degrees
+        :param dt: the interval between updating position
+        :type dt: float
+        :return: the derivatives of the landing position, shape (3, 7), and of the landing time, max height and time
+            of max height, shape (7,)
+        :rtype: dict[str, np.ndarray]
+        """
+        ele_angle, azi_angle = rad(self.ele_angle), rad(self.azi_angle)
+        s = np.zeros((6, len(SENSITIVITY_PARAMETERS)))
+        s[3:, 0] = [cos(ele_angle) * cos(azi_angle), cos(ele_angle) * sin(azi_angle), sin(ele_angle)]
+        s[3:, 1] = rad(self.velocity) * np.array([-sin(ele_angle) * cos(azi_angle), -sin(ele_angle) * sin(azi_angle),
+                                                  cos(ele_angle)])
+        s[3:, 2] = rad(self.velocity) * np.array([-cos(ele_angle) * sin(azi_angle), cos(ele_angle) * cos(azi_angle), 0])
+
+        state = np.concatenate((self.pos, self.v, s.ravel())).astype(float)
+        times, states, hits = integrators.integrate(self.sensitivityDerivative, integrators.rk4, self.time, state, dt,
+                                                    self.flightEvents())
+        self.land(times, states[:, :3], states[-1, :6], [(name, time, y[:6]) for name, time, y in hits])
+
+        jacobian = {"max_h": np.zeros(s.shape[1]), "max_t": np.zeros(s.shape[1])}
+        for name, time, y in hits:
+            s = y[6:].reshape(6, -1)
+            if name == "ground":
+                # The landing time moves so the height stays on the ground
+                jacobian["landing_time"] = -s[2] / y[5]
+                jacobian["landing_pos"] = s[:3] + np.outer(y[3:6], jacobian["landing_time"])
+            elif name == "apex" and time == self.max_t:
+                # The vertical velocity is zero at the apex, so the max height only changes with the height
+                jacobian["max_h"] = s[2]
+                jacobian["max_t"] = -s[5] / self.derivative(time, y[:6])[5]
+        return jacobian
+
+    def flyAdaptive(self, rtol=1e-6, atol=1e-6, dt=None, events=()):
+        """
+        Updates the position until the projectile is on the ground using the adaptive Dormand-Prince method. Events
+        are located within each step using the dense output
+        :param rtol: the relative tolerance of each step
+        :type rtol: float
+        :param atol: the absolute tolerance of each step
+        :type atol: float
+        :param dt: the interval between stored coordinates; if None, the end of each step is stored
+        :type dt: float | None
+        :param events: extra events to detect, such as integrators.altitude_event
+        :type events: Iterable[integrators.Event]
+        :return: the accepted steps with dense output
+        :rtype: integrators.DenseSolution
+        """
+        state = np.concatenate((self.pos, self.v)).astype(float)
+        solution, hits = integrators.dormand_prince(self.derivative, self.time, state, self.flightEvents(events),
+                                                    rtol, atol)
+        self.steps = len(solution) - 1
+        end = hits[-1][1] if hits and hits[-1][0] == "ground" else solution.t[-1]
+
+        if dt is None:
+            times = np.asarray(solution.t)
+        else:
+            times = np.arange(self.time, end, dt)
+        # Adds the times of the events so the apex and landing are stored exactly
+        times = np.union1d(times[times < end], [time for name, time, state in hits] + [end])
+        states = solution(times)
+        self.land(times, states[:, :3], states[-1], hits)
+        return solution
+
+    def flightEvents(self, events=()):
+        """
+        Creates the list of events detected during a flight
+        :param events: extra events to detect
+        :type events: Iterable[integrators.Event]
+        :return: the ground and apex events followed by the extra events
+        :rtype: list[integrators.Event]
+        """
+        return [integrators.ground_event(), integrators.apex_event(), *events]
+
+    def land(self, times, positions, state, hits, store=True):
+        """
+        Stores the results of a flight, or of the part of a flight so far
+        :param times: the times of the flight, starting at the current time
+        :type times: np.ndarray
+        :param positions: the positions at each time, shape (n, 3)
+        :type positions: np.ndarray
+        :param state: the state when the flight ended
+        :type state: np.ndarray
+        :param hits: the events which happened as (name, time, state)
+        :type hits: list[tuple[str, float, np.ndarray]]
+        :param store: Whether the positions are added to the path
+        :type store: bool
+        """
+        if store:
+            self.record(times[1:], positions[1:], [time for name, time, hit_state in hits])
+        self.events = hits
+        self.landed = any(name == "ground" for name, time, hit_state in hits)
+
+        apex = [(time, apex_state) for name, time, apex_state in hits if name == "apex"]
+        if apex:
+            if apex[0][1][2] > self.max_h:
+                self.max_t, self.max_h = apex[0][0], apex[0][1][2]
+        else:  # If the projectile was already falling
+            i = np.argmax(positions[:, 2])
+            if positions[i, 2] > self.max_h:
+                self.max_h = positions[i, 2]
+                self.max_t = times[i]
+        self.pos = state[:3]
+        self.v = state[3:]
+        self.p = self.m * self.v
+        self.time = times[-1]
+
+    def locate(self, column, start, end):
+        """
+        Finds when a column of the state crosses zero within a step using the Hermite interpolant
+        :param column: The column of the state, 2 for the height or 5 for the vertical velocity
+        :type column: int
+        :param start: The time and state at the start of the step
+        :type start: tuple[float, Iterable[float]]
+        :param end: The time and state at the end of the step
+        :type end: tuple[float, Iterable[float]]
+        :return: the time of the crossing and the state at that time
+        :rtype: tuple[float, np.ndarray]
+        """
+        (t0, y0), (t1, y1) = start, end
+        y0, y1 = np.array(y0, dtype=float), np.array(y1, dtype=float)
+        interpolant = integrators.hermite(t0, y0, self.derivative(t0, y0), t1, y1, self.derivative(t1, y1))
+        time = float(integrators.bisect(lambda t: interpolant(t)[..., column], t0, t1))
+        return time, interpolant(time)
+
+    def flyKernel(self, dt):
+        """
+        Updates the position until the projectile is on the ground using the kernel of the chosen integrator, which
+        keeps the state in floats and runs the whole flight in one call. Agrees to rounding with stepping the same
+        integrator through integrators.integrate, and uses _chunks with one part for the whole flight so it matches
+        stream exactly
+        :param dt: the interval between updating position
+        :type dt: float
+        """
+        for data in self._chunks(dt, 2 ** 62):
+            self.record(data[:, 0], data[:, 1:], [time for name, time, state in self.events])
 
     def move(self, dt):
         """
-        Updates the position and time
+        Updates the position and time using one step of the chosen integrator, storing the position with the
+        recording policy. Policies which compare samples, such as tolerance, only see one step at a time so they
+        store every step
         :param dt: the interval between updating position
         :type dt: float
         """
@@ -200,43 +1171,485 @@ class ProjectileDrag(Projectile):
         if self.pos[2] > self.max_h:
             self.max_h = self.pos[2]
             self.max_t = self.time
-        self.v = self.p / self.m
-        # Calculates the net force on the projectile
-        F_net = self.m * self.g - 0.5 * self.area * self.cd * self.rho * self.v * mag(self.v)
-        self.p += F_net * dt
-        self.pos += self.p * dt / self.m
+        state = self.step(self.derivative, self.time, np.concatenate((self.pos, self.v)).astype(float), dt)
+        self.pos = state[:3]
+        self.v = state[3:]
+        self.p = self.m * self.v
         self.time += dt
-        self.coords.append([*self.pos])
+        self.record(np.array([self.time]), self.pos[None])
+
+    def fly(self, dt, events=()):
+        """
+        Updates the position until the projectile is on the ground. The landing and apex are located within the step
+        they happen in, so the landing position is exactly on the ground. Adaptive integrators choose their own steps
+        and store coordinates every dt, and integrators with a kernel in KERNELS use it when there are no extra events.
+        A projectile below the ground has already landed, as the ground is only hit when falling onto it
+        :param dt: the interval between updating position
+        :type dt: float
+        :param events: extra events to detect, such as integrators.altitude_event
+        :type events: Iterable[integrators.Event]
+        """
+        if self.pos[2] < 0:
+            return
+        if self.integrator in integrators.ADAPTIVE:
+            self.flyAdaptive(self.rtol, self.atol, dt, events)
+        elif self.integrator in KERNELS and not events:
+            self.flyKernel(dt)
+        else:
+            state = np.concatenate((self.pos, self.v)).astype(float)
+            times, states, hits = integrators.integrate(self.derivative, self.step, self.time, state, dt,
+                                                        self.flightEvents(events))
+            self.land(times, states[:, :3], states[-1], hits)
 
+    def _chunks(self, dt, size):
+        """
+        Flies the projectile a part at a time with the same steps as fly, so the path is never stored whole
+        :param dt: the interval between updating position, or between stored coordinates for adaptive integrators
+        :type dt: float
+        :param size: the number of steps in each part
+        :type size: int
+        :return: parts of the path after the current time as rows of (time, x, y, z), or none if the projectile is
+            below the ground
+        :rtype: Iterator[np.ndarray]
+        """
+        hits = []
+        landed = self.pos[2] < 0  # Already landed, as with fly
+        state = np.concatenate((self.pos, self.v)).astype(float)
+        max_h, max_t = self.max_h, self.max_t  # Before the flight, as the apex replaces the highest point so far
+        if self.integrator in KERNELS:
+            kernel = KERNELS[self.integrator]
+            gz = float(self.g[2])
+            while not landed:
+                samples = array("d")
+                start, end, apex = kernel(float(self.time), tuple(state.tolist()), dt, gz, self.k, samples,
+                                           size)
+                steps = np.frombuffer(samples).reshape(-1, 4)
+                landed = start is not None
+                parts = [np.array([[self.time, *state[:3]]]), steps[:-1] if landed else steps]
+                if apex is not None:
+                    i, apex_start, apex_end = apex
+                    apex_time, apex_state = self.locate(5, apex_start, apex_end)
+                    hits.append(("apex", apex_time, apex_state))
+                    # Inserts the apex before the end of the step it happened in
+                    parts[1:] = [parts[1][:i], np.array([[apex_time, *apex_state[:3]]]), parts[1][i:]]
+                if landed:
+                    landing_time, state = self.locate(2, start, end)
+                    hits.append(("ground", landing_time, state))
+                    parts.append(np.array([[landing_time, *state[:3]]]))
+                else:
+                    state = np.array(end[1])
+                data = np.concatenate(parts)
+                self.land(data[:, 0], data[:, 1:], state, hits, store=False)
+                yield data[1:]
+        elif self.integrator in integrators.ADAPTIVE:
+            origin = self.time
+            self.steps = 0
+            while not landed:
+                solution, step_hits = integrators.dormand_prince(self.derivative, self.time, state,
+                                                                 self.flightEvents(), self.rtol, self.atol, size)
+                self.steps += len(solution) - 1
+                hits += step_hits
+                landed = bool(step_hits) and step_hits[-1][0] == "ground"
+                end = step_hits[-1][1] if landed else solution.t[-1]
+                if dt is None:
+                    times = np.asarray(solution.t)
+                else:  # Keeps the stored coordinates every dt from the start of the flight
+                    times = origin + dt * np.arange(np.ceil((self.time - origin) / dt), (end - origin) / dt)
+                times = np.union1d(times[(times > self.time) & (times < end)],
+                                   [time for name, time, hit_state in step_hits] + [end])
+                states = solution(times)
+                state = states[-1]
+                self.land(np.append(self.time, times), np.vstack((self.pos, states[:, :3])), state, hits, store=False)
+                yield np.column_stack((times, states[:, :3]))
+        else:
+            while not landed:
+                times, states, step_hits = integrators.integrate(self.derivative, self.step, self.time, state, dt,
+                                                                 self.flightEvents(), size)
+                hits += step_hits
+                landed = bool(step_hits) and step_hits[-1][0] == "ground"
+                state = states[-1]
+                self.land(times, states[:, :3], state, hits, store=False)
+                yield np.column_stack((times[1:], states[1:, :3]))
 
-def compare_paths(projectile_1, projectile_2, fig):
+        apex = [(time, apex_state) for name, time, apex_state in hits if name == "apex"]
+        if apex:
+            self.max_h, self.max_t = max_h, max_t
+            if apex[0][1][2] > self.max_h:
+                self.max_t, self.max_h = apex[0][0], apex[0][1][2]
+
+
+class ProjectileBatch:
+    def __init__(self, velocity, ele_angle, azi_angle, x, y, z, gravity, mass, air_density, drag_coefficient, area,
+                 integrator="semi-implicit euler", ground=0):
+        """
+        Creates a batch of N projectiles with drag which are all moved at once. Each argument takes the same value as
+        in ProjectileDrag, either as a single number shared by every projectile or as an array with one value per
+        projectile
+        :param velocity: The magnitudes of the initial velocities
+        :type velocity: float | int | np.ndarray
+        :param ele_angle: The elevation angles
+        :type ele_angle: float | int | np.ndarray
+        :param azi_angle: The azimuth angles
+        :type azi_angle: float | int | np.ndarray
+        :param x: The initial x coordinates
+        :type x: float | int | np.ndarray
+        :param y: The initial y coordinates
+        :type y: float | int | np.ndarray
+        :param z: The initial z coordinates (heights)
+        :type z: float | int | np.ndarray
+        :param gravity: The magnitudes of acceleration due to gravity
+        :type gravity: float | int | np.ndarray
+        :param mass: The masses of the projectiles
+        :type mass: float | int | np.ndarray
+        :param air_density: The air densities of the medium
+        :type air_density: float | int | np.ndarray
+        :param drag_coefficient: The drag coefficients of the projectiles
+        :type drag_coefficient: float | int | np.ndarray
+        :param area: The surface areas of the projectiles
+        :type area: float | int | np.ndarray
+        :param integrator: The name of the fixed-step integrator in integrators.INTEGRATORS
+        :type integrator: str
+        :param ground: The heights where the projectiles land. A projectile launched below its ground lands when it
+            falls back through it, and misses if it starts falling before reaching it
+        :type ground: float | int | np.ndarray
+        """
+        if integrator not in integrators.INTEGRATORS:
+            raise ValueError(f"Unknown integrator '{integrator}'")
+        self.integrator = integrator
+        self.step = integrators.INTEGRATORS[integrator]  # Function which moves the states by one step
+
+        values = _broadcast(velocity, ele_angle, azi_angle, x, y, z, gravity, mass, air_density, drag_coefficient, area,
+                            ground)
+        velocity, ele_angle, azi_angle, x, y, z, gravity, mass, air_density, drag_coefficient, area, ground = values
+        self.n = velocity.size  # Number of projectiles
+
+        self.u = _initial_velocity(velocity, ele_angle, azi_angle)
+        self.pos0 = np.column_stack((x, y, z))  # Initial positions, shape (N, 3)
+        self.pos = self.pos0.copy()  # Current positions, shape (N, 3)
+        self.v = self.u.copy()  # Current velocities, shape (N, 3)
+        self.g = np.column_stack((np.zeros(self.n), np.zeros(self.n), -gravity))  # Gravity vectors
+
+        self.m = mass.copy()  # Masses
+        self.rho = air_density.copy()  # Air densities
+        self.cd = drag_coefficient.copy()  # Drag coefficients
+        self.area = area.copy()  # Surface areas
+        self.k = 0.5 * self.area * self.cd * self.rho / self.m  # Drag force per unit mass per speed squared
+
+        self.max_h = self.pos0[:, 2].copy()  # Maximum heights reached by the projectiles
+        self.max_t = np.zeros(self.n)  # Times when max heights reached
+        self.time = np.zeros(self.n)  # Time of each projectile, frozen once it lands
+
+        self.ground = ground.copy()  # Heights where the projectiles land
+        self.live = (self.pos[:, 2] >= self.ground) | (self.v[:, 2] >= 0)  # Mask of the projectiles still in the air
+        self.missed = ~self.live  # Mask of the projectiles which never reached their ground
+
+    @staticmethod
+    def derivative(state, g, k):
+        """
+        Calculates the rate of change of the states [x, y, z, vx, vy, vz]
+        :param state: the positions and velocities, shape (n, 6)
+        :type state: np.ndarray
+        :param g: the gravity vectors, shape (n, 3)
+        :type g: np.ndarray
+        :param k: the drag force per unit mass per speed squared, shape (n, 1)
+        :type k: np.ndarray
+        :return: the velocities and accelerations, shape (n, 6)
+        :rtype: np.ndarray
+        """
+        v = state[:, 3:]
+        speed = np.sqrt(np.einsum("ij,ij->i", v, v))[:, None]
+        return np.hstack((v, g - k * v * speed))
+
+    def move(self, dt):
+        """
+        Updates the positions and times of every projectile still in the air using one step of the chosen integrator
+        :param dt: the interval between updating position
+        :type dt: float
+        """
+        i = np.flatnonzero(self.live)
+        pos, time = self.pos[i], self.time[i]
+        # Checks which projectiles have risen
+        rising = pos[:, 2] > self.max_h[i]
+        self.max_h[i] = np.where(rising, pos[:, 2], self.max_h[i])
+        self.max_t[i] = np.where(rising, time, self.max_t[i])
+        g, k = self.g[i], self.k[i, None]
+        state = self.step(lambda t, y: self.derivative(y, g, k), time, np.hstack((pos, self.v[i])), dt)
+        self.pos[i], self.v[i], self.time[i] = state[:, :3], state[:, 3:], time + dt
+        self.live[i] = (state[:, 2] >= self.ground[i]) | (state[:, 5] >= 0)
+
+    def fly(self, dt, store=None):
+        """
+        Moves every projectile until it has landed. The projectiles still in the air are kept in compact arrays which
+        are only resized when a projectile lands. The apex and landing of each projectile are located within the step
+        they happen in, so the landing positions are exactly on the ground
+        :param dt: the interval between updating position
+        :type dt: float
+        :param store: The store the path of each projectile is added to in order, or None to not keep the paths
+        :type store: trajectory_store.TrajectoryStore | None
+        :return: the batch
+        :rtype: ProjectileBatch
+        """
+        i = np.flatnonzero(self.live)
+        state, g, k = np.hstack((self.pos[i], self.v[i])), self.g[i], self.k[i, None]
+        time, ground = self.time[i], self.ground[i]
+        apex_steps, landing_steps = [], []  # Steps containing each apex and landing, located once all have landed
+        # Rows of (projectile, time, x, y, z) visited by every projectile, starting with their current positions
+        records = [np.column_stack((np.arange(self.n), self.time, self.pos))] if store is not None else None
+        while i.size:
+            new_state = self.step(lambda t, y: self.derivative(y, g, k), time, state, dt)
+            new_time = time + dt
+
+            apex = (state[:, 5] >= 0) & (new_state[:, 5] < 0)
+            if apex.any():
+                apex_steps.append((i[apex], time[apex], state[apex], new_time[apex], new_state[apex]))
+
+            below = new_state[:, 2] < ground
+            landed = below & (state[:, 2] >= ground)
+            missed = below & ~landed & (new_state[:, 5] < 0)  # Started falling without reaching the ground
+            if landed.any() or missed.any():
+                landing_steps.append((i[landed], time[landed], state[landed], new_time[landed], new_state[landed]))
+                j = i[missed]
+                self.missed[j] = True
+                self.pos[j], self.v[j], self.time[j] = new_state[missed, :3], new_state[missed, 3:], new_time[missed]
+                self.live[i[landed | missed]] = False
+                air = ~(landed | missed)
+                i, new_state, new_time, g, k, ground = i[air], new_state[air], new_time[air], g[air], k[air], ground[air]
+            if records is not None:
+                records.append(np.column_stack((i, new_time, new_state[:, :3])))
+            state, time = new_state, new_time
+
+        if apex_steps:
+            j, t, y = self.locate(5, apex_steps)
+            higher = y[:, 2] > self.max_h[j]
+            self.max_h[j[higher]], self.max_t[j[higher]] = y[higher, 2], t[higher]
+        if landing_steps:
+            j, t, y = self.locate(2, landing_steps, self.ground)
+            self.pos[j], self.v[j], self.time[j] = y[:, :3], y[:, 3:], t
+            if records is not None:
+                records.append(np.column_stack((j, t, y[:, :3])))
+        if records is not None:
+            rows = np.concatenate(records)
+            rows = rows[np.argsort(rows[:, 0], kind="stable")]  # Groups the rows by projectile, keeping them in order
+            store.appendMany(rows[:, 1:], np.bincount(rows[:, 0].astype(int), minlength=self.n))
+        return self
+
+    def locate(self, column, steps, levels=None):
+        """
+        Finds when a column of the state crosses a level within the steps where it crossed, using the Hermite
+        interpolant of each step
+        :param column: The column of the state, 2 for the height or 5 for the vertical velocity
+        :type column: int
+        :param steps: The steps as (rows, start times, start states, end times, end states)
+        :type steps: list[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]]
+        :param levels: The level of every projectile, or None for zero
+        :type levels: np.ndarray | None
+        :return: the rows, the times of the crossings and the states at those times
+        :rtype: tuple[np.ndarray, np.ndarray, np.ndarray]
+        """
+        j, t0, y0, t1, y1 = (np.concatenate(values) for values in zip(*steps))
+        g, k = self.g[j], self.k[j, None]
+        level = 0 if levels is None else levels[j]
+        interpolant = integrators.hermite(t0, y0, self.derivative(y0, g, k), t1, y1, self.derivative(y1, g, k))
+        t = integrators.bisect(lambda time: interpolant(time)[:, column] - level, t0, t1)
+        return j, t, interpolant(t)
+
+    def results(self):
+        """
+        Gets the results of every projectile, which are only final once the batch has flown. The landing time,
+        position and final speed are NaN for projectiles which missed their ground
+        :return: arrays of the landing time, landing position, max height, time of max height, and final speed
+        :rtype: dict[str, np.ndarray]
+        """
+        return {
+            "landing_time": np.where(self.missed, np.nan, self.time),
+            "landing_pos": np.where(self.missed[:, None], np.nan, self.pos),
+            "max_h": self.max_h.copy(),
+            "max_t": self.max_t.copy(),
+            "final_speed": np.where(self.missed, np.nan, self.speed())
+        }
+
+    def speed(self):
+        """
+        Calculates the current speed of each projectile
+        :return: the magnitudes of the velocities
+        :rtype: np.ndarray
+        """
+        return np.sqrt(np.einsum("ij,ij->i", self.v, self.v))
+
+    def calcDisplacement(self):
+        """
+        Calculates the displacement of each projectile
+        :return: the magnitudes of the displacements
+        :rtype: np.ndarray
+        """
+        s = self.pos - self.pos0
+        return np.sqrt(np.einsum("ij,ij->i", s, s))
+
+
+# Arguments of ProjectileNoDrag, and the extra arguments of ProjectileDrag
+NO_DRAG_ARGUMENTS = ("velocity", "ele_angle", "azi_angle", "x", "y", "z", "gravity")
+DRAG_ARGUMENTS = ("mass", "air_density", "drag_coefficient", "area")
+# Columns of the results of a sweep, added to the columns of the arguments
+SWEEP_COLUMNS = ("landing_x", "landing_y", "landing_z", "landing_time", "max_h", "max_t", "final_speed")
+
+
+def _sweep_chunk(table, names, axes, drag, rows, dt, integrator, store=None):
     """
-    Plots the flight paths of two projectiles on one scatter graph
-    :param projectile_1: The 1st projectile object
-    :type projectile_1: Projectile
-    :param projectile_2: The 2nd projectile object
-    :type projectile_2: Projectile
+    Simulates one chunk of a sweep and writes the arguments and results into the table
+    :param table: The table with one row per column and one column per combination
+    :type table: np.ndarray
+    :param names: The names of the arguments
+    :type names: tuple[str, ...]
+    :param axes: The values of each argument
+    :type axes: list[np.ndarray]
+    :param drag: If the projectiles have drag
+    :type drag: bool
+    :param rows: The combinations in the chunk
+    :type rows: slice
+    :param dt: The interval between updating position for projectiles with drag
+    :type dt: float
+    :param integrator: The name of the fixed-step integrator used for drag
+    :type integrator: str
+    :param store: The store the path of each projectile is added to, or None to not keep the paths
+    :type store: trajectory_store.TrajectoryStore | None
+    """
+    # Finds the value of each argument for the combinations in the chunk
+    indices = np.unravel_index(np.arange(rows.start, rows.stop), tuple(axis.size for axis in axes))
+    values = {name: axis[index] for name, axis, index in zip(names, axes, indices)}
+    if drag:
+        results = ProjectileBatch(**values, integrator=integrator).fly(dt, store).results()
+    else:
+        results = no_drag_results(**values)
+        if store is not None:
+            times, positions = trajectories_no_drag(**values)
+            store.appendMany(np.concatenate((times[:, :, None], positions), axis=2).reshape(-1, 4),
+                             np.full(len(times), times.shape[1]))
+
+    columns = [values[name] for name in names] + list(results["landing_pos"].T)
+    columns += [results[name] for name in SWEEP_COLUMNS[3:]]
+    for i, column in enumerate(columns):
+        table[i, rows] = column
+
+
+def _sweep_worker(memory_name, shape, names, axes, drag, rows, dt, integrator):
+    """
+    Simulates one chunk of a sweep in a worker process, writing into the table in shared memory
+    :param memory_name: The name of the shared memory block holding the table
+    :type memory_name: str
+    :param shape: The shape of the table
+    :type shape: tuple[int, int]
+    The other parameters are the same as _sweep_chunk
+    """
+    memory = shared_memory.SharedMemory(name=memory_name)
+    table = np.ndarray(shape, buffer=memory.buf)
+    _sweep_chunk(table, names, axes, drag, rows, dt, integrator)
+    del table  # The memory can't be closed while an array uses it
+    memory.close()
+
+
+def sweep(grid_spec, dt=0.01, integrator="semi-implicit euler", chunk_size=100000, workers=1, store=None):
+    """
+    Simulates every combination of the given values of the arguments of ProjectileNoDrag or ProjectileDrag. The
+    combinations are simulated in batches of chunk_size, so only the results are kept and not the flight paths. With
+    more than one worker the chunks are shared between processes, which write their results straight into shared
+    memory
+    :param grid_spec: The values of each argument, either a single number or a list of numbers. Projectiles have drag
+        if the arguments of ProjectileDrag are given
+    :type grid_spec: dict[str, float | int | Iterable[float]]
+    :param dt: The interval between updating position for projectiles with drag
+    :type dt: float
+    :param integrator: The name of the fixed-step integrator in integrators.INTEGRATORS used for drag
+    :type integrator: str
+    :param chunk_size: The number of projectiles simulated at once
+    :type chunk_size: int
+    :param workers: The number of processes used
+    :type workers: int
+    :param store: The store the path of each combination is added to in order, which needs one worker, or None to
+        not keep the paths
+    :type store: trajectory_store.TrajectoryStore | None
+    :return: a column for each argument and each of SWEEP_COLUMNS, with one row per combination in the order of
+        itertools.product
+    :rtype: dict[str, np.ndarray]
+    """
+    drag = any(name in grid_spec for name in DRAG_ARGUMENTS)
+    names = NO_DRAG_ARGUMENTS + DRAG_ARGUMENTS if drag else NO_DRAG_ARGUMENTS
+    missing = [name for name in names if name not in grid_spec]
+    unknown = [name for name in grid_spec if name not in names]
+    if missing or unknown:
+        raise ValueError(f"Missing arguments {missing} and unknown arguments {unknown}")
+    if store is not None and workers > 1:
+        raise ValueError("Paths can only be stored with one worker")
+
+    axes = [np.atleast_1d(np.asarray(grid_spec[name], dtype=float)).ravel() for name in names]
+    total = int(np.prod([axis.size for axis in axes]))
+    columns = names + SWEEP_COLUMNS
+    shape = (len(columns), total)
+
+    if workers <= 1:
+        table = np.empty(shape)
+        for start in range(0, total, chunk_size):
+            _sweep_chunk(table, names, axes, drag, slice(start, min(start + chunk_size, total)), dt, integrator, store)
+        return dict(zip(columns, table))
+
+    # Splits the work into at least 4 chunks per worker so they finish at similar times
+    chunk_size = max(min(chunk_size, -(-total // (4 * workers))), 1)
+    memory = shared_memory.SharedMemory(create=True, size=max(8 * len(columns) * total, 1))
+    try:
+        table = np.ndarray(shape, buffer=memory.buf)
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(_sweep_worker, memory.name, shape, names, axes, drag,
+                                       slice(start, min(start + chunk_size, total)), dt, integrator)
+                       for start in range(0, total, chunk_size)]
+            for future in futures:
+                future.result()
+        results = dict(zip(columns, table.copy()))
+        del table
+    finally:
+        memory.close()
+        memory.unlink()
+    return results
+
+
+def path_bounds(projectiles):
+    """
+    Finds the lowest and highest coordinates of the paths of many projectiles, joining the paths so there is one
+    reduction for each instead of one for each path and axis
+    :param projectiles: The projectiles
+    :type projectiles: Iterable[Projectile]
+    :return: the lowest and highest x, y and z, shape (2, 3)
+    :rtype: np.ndarray
+    """
+    coords = np.concatenate([proj.coords for proj in projectiles])
+    return np.stack((coords.min(axis=0), coords.max(axis=0)))
+
+
+def plot_paths(projectiles, fig):
+    """
+    Plots the flight paths of any number of projectiles on one graph, such as with drag for many drag coefficients.
+    Every path is drawn by one collection of lines, and the markers by one scatter for each marker style, so plotting
+    100 paths takes about as long as plotting 2
+    :param projectiles: The projectiles
+    :type projectiles: list[Projectile]
     :param fig: Matplotlib figure
     :return: Matplotlib subplot
     """
     ax = fig.add_subplot(111, projection='3d')
 
-    for projectile in (projectile_1, projectile_2):
-        n = (len(projectile.coords) // 20) + 1
-        ax.scatter([row[0] for row in projectile.coords][::n],
-                   [row[1] for row in projectile.coords][::n],
-                   [row[2] for row in projectile.coords][::n],
-                   c=projectile.colour, marker=projectile.marker)
+    ax.add_collection3d(Line3DCollection([proj.coords for proj in projectiles],
+                                         colors=[proj.colour for proj in projectiles]), autolim=False)
 
-    max_coords_1 = max([max(row[0] for row in projectile_1.coords),
-                        max(row[1] for row in projectile_1.coords),
-                        max(row[2] for row in projectile_1.coords)])
+    # Groups the markers of the projectiles by their style
+    markers = {}
+    for proj in projectiles:
+        n = (len(proj.coords) // 20) + 1
+        markers.setdefault(proj.marker, []).append((proj.coords[::n], proj.colour))
+    for marker, groups in markers.items():
+        points = np.concatenate([points for points, colour in groups])
+        colours = np.repeat(to_rgba_array([colour for points, colour in groups]),
+                            [len(points) for points, colour in groups], axis=0)
+        ax.scatter(*points.T, color=colours, marker=marker)
 
-    max_coords_2 = max([max(row[0] for row in projectile_2.coords),
-                        max(row[1] for row in projectile_2.coords),
-                        max(row[2] for row in projectile_2.coords)])
-
-    max_coords = max(max_coords_1, max_coords_2)
+    max_coords = path_bounds(projectiles)[1].max()  # Finds the max coordinate
 
     ax.set_xlabel('X Axis / m')
     ax.set_ylabel('Y Axis / m')
@@ -248,3 +1661,16 @@ def compare_paths(projectile_1, projectile_2, fig):
     ax.set_zlim3d(0, max_coords)
 
     return ax
+
+
+def compare_paths(projectile_1, projectile_2, fig):
+    """
+    Plots the flight paths of two projectiles on one graph
+    :param projectile_1: The 1st projectile object
+    :type projectile_1: Projectile
+    :param projectile_2: The 2nd projectile object
+    :type projectile_2: Projectile
+    :param fig: Matplotlib figure
+    :return: Matplotlib subplot
+    """
+    return plot_paths([projectile_1, projectile_2], fig)
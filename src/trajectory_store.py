@@ -0,0 +1,167 @@
+# On-disk store of flight paths which can be larger than memory
+# Created: 17/10/26
+# A store is a directory holding three files:
+#   data.f64     every path one after another, as float64 rows of (time, x, y, z)
+#   offsets.i64  the row where each path ends, as int64
+#   meta.json    the layout of the files
+# Files are only appended to, and are read with np.memmap so only the pages which are used are loaded
+
+import numpy as np                  # Used for memory mapping the files
+import json                         # Used for storing the layout
+import os                           # Used for creating the directory
+
+
+COLUMNS = ("time", "x", "y", "z")
+
+
+class TrajectoryStore:
+    def __init__(self, path, mode="r"):
+        """
+        Opens a store of flight paths
+        :param path: The directory of the store
+        :type path: str
+        :param mode: "r" to read an existing store, or "a" to append to it, creating it if needed
+        :type mode: str
+        """
+        if mode not in ("r", "a"):
+            raise ValueError(f"Unknown mode '{mode}'")
+        self.path = path
+        self.mode = mode
+        self.data_path = os.path.join(path, "data.f64")
+        self.offsets_path = os.path.join(path, "offsets.i64")
+        meta_path = os.path.join(path, "meta.json")
+
+        if mode == "a" and not os.path.exists(meta_path):
+            os.makedirs(path, exist_ok=True)
+            open(self.data_path, "ab").close()
+            open(self.offsets_path, "ab").close()
+            with open(meta_path, "w") as file:
+                json.dump({"columns": COLUMNS, "dtype": "float64", "offsets_dtype": "int64"}, file)
+        with open(meta_path) as file:
+            self.meta = json.load(file)
+
+        self._data = None  # Memory maps, which are remade after appending
+        self._offsets = None
+        self._data_file = open(self.data_path, "ab") if mode == "a" else None
+        self._offsets_file = open(self.offsets_path, "ab") if mode == "a" else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, i):
+        """
+        Reads one path without copying it
+        :param i: The index of the path
+        :type i: int
+        :return: the rows of (time, x, y, z), shape (n, 4)
+        :rtype: np.ndarray
+        """
+        offsets = self.offsets
+        if not -len(offsets) <= i < len(offsets):
+            raise IndexError(f"Path {i} out of range")
+        i %= len(offsets)
+        start = offsets[i - 1] if i else 0
+        return self.data[start:offsets[i]]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def offsets(self):
+        """
+        The row where each path ends
+        :rtype: np.ndarray
+        """
+        if self._offsets is None:
+            self._offsets = self._map(self.offsets_path, np.int64, 1)
+        return self._offsets
+
+    @property
+    def data(self):
+        """
+        Every row of every path, shape (rows, 4)
+        :rtype: np.ndarray
+        """
+        if self._data is None:
+            self._data = self._map(self.data_path, np.float64, len(COLUMNS))
+        return self._data
+
+    @staticmethod
+    def _map(path, dtype, width):
+        """
+        Memory maps a file of rows, read only
+        :param path: The path of the file
+        :type path: str
+        :param dtype: The type of the values
+        :type dtype: type
+        :param width: The number of values in each row
+        :type width: int
+        :return: the rows, shape (n,) if the width is 1 or (n, width) otherwise
+        :rtype: np.ndarray
+        """
+        rows = os.path.getsize(path) // (np.dtype(dtype).itemsize * width)
+        if not rows:  # Empty files can't be memory mapped
+            return np.empty((0, width) if width > 1 else 0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(rows, width) if width > 1 else (rows,))
+
+    def lengths(self):
+        """
+        Gets the number of rows in every path
+        :return: the lengths
+        :rtype: np.ndarray
+        """
+        return np.diff(self.offsets, prepend=0)
+
+    def append(self, path):
+        """
+        Adds one path to the end of the store
+        :param path: The rows of (time, x, y, z), such as a TrajectoryBuffer
+        :type path: np.ndarray | TrajectoryBuffer
+        """
+        path = np.asarray(path, dtype=np.float64)
+        self.appendMany(path, [len(path)])
+
+    def appendMany(self, data, lengths):
+        """
+        Adds many paths to the end of the store in one write
+        :param data: The rows of every path one after another, shape (rows, 4)
+        :type data: np.ndarray
+        :param lengths: The number of rows in each path
+        :type lengths: Iterable[int]
+        """
+        if self.mode != "a":
+            raise ValueError("Store is read only")
+        data = np.ascontiguousarray(data, dtype=np.float64)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        if data.ndim != 2 or data.shape[1] != len(COLUMNS) or lengths.sum() != len(data):
+            raise ValueError(f"Expected {lengths.sum()} rows of {len(COLUMNS)} values, got shape {data.shape}")
+        end = int(self.offsets[-1]) if len(self.offsets) else 0
+        self._data_file.write(data.tobytes())
+        self._offsets_file.write((end + np.cumsum(lengths)).tobytes())
+        self.flush()
+
+    def flush(self):
+        """
+        Writes the appended paths to disk so they can be read
+        """
+        if self._data_file is not None:
+            self._data_file.flush()
+            self._offsets_file.flush()
+        self._data = self._offsets = None
+
+    def close(self):
+        """
+        Closes the files of the store
+        """
+        if self._data_file is not None:
+            self._data_file.close()
+            self._offsets_file.close()
+            self._data_file = self._offsets_file = None
+        self._data = self._offsets = None